@@ -0,0 +1,90 @@
+"""测量两种合成引擎合成一批图片所需的时间
+
+每种情况合成6张图片（2行3列），分别测量竖向图片和需要旋转90度的横向图片。
+同时测量旧的 NumPy 实现（按跨步数组视图写入画布）作为对比。
+测量的是合成画布和计算像素校验值的时间，不包括解码和编码。
+
+用法：
+    python benchmark_assembly.py [--runs 3] [--size 2000x3000]
+"""
+import argparse
+import time
+
+import numpy as np
+
+import main
+
+main.load_image_codecs()
+from main import Image
+
+
+def make_batch(mode, tile_size, rotated):
+    """生成一批相同的图片，rotated 为 True 时图片为横向，合成时逆时针旋转90度"""
+    width, height = tile_size
+    stored_size = (height, width) if rotated else (width, height)
+    rng = np.random.default_rng(0)
+    channels = main.CANVAS_CHANNELS[mode]
+    shape = (stored_size[1], stored_size[0]) + ((channels,) if channels > 1 else ())
+    tile = Image.fromarray(rng.integers(0, 256, shape, dtype=np.uint8), mode)
+    tile.load()
+
+    images, cells = [], []
+    for i in range(6):
+        row, col = divmod(i, 3)
+        cells.append((col * width, row * height, width, height))
+        images.append({
+            'image': tile, 'x': col * width, 'y': row * height, 'width': width, 'height': height,
+            'transform': 'ROTATE_90' if rotated else None,
+        })
+    return images, cells, (3 * width, 2 * height)
+
+
+def assemble_strided(images, cells, canvas_mode, size):
+    """旧的 NumPy 实现：方向变换以跨步数组视图的形式写入画布"""
+    views = {None: lambda a: a, 'ROTATE_90': lambda a: np.rot90(a, 1)}
+    total_width, total_height = size
+    channels = main.CANVAS_CHANNELS[canvas_mode]
+    shape = (total_height, total_width) + ((channels,) if channels > 1 else ())
+    canvas = np.empty(shape, dtype=np.uint8)
+    for img_info in images:
+        x, y, w, h = img_info['x'], img_info['y'], img_info['width'], img_info['height']
+        tile = np.asarray(main.convert_to_mode(img_info['image'], canvas_mode))
+        canvas[y:y + h, x:x + w] = views[img_info['transform']](tile)
+        digest = main.new_pixel_digest()
+        for row in canvas[y:y + h, x:x + w]:
+            digest.update(row)
+        img_info['pixel_digest'] = main.format_pixel_digest(digest)
+    return Image.frombuffer(canvas_mode, size, canvas, 'raw', canvas_mode, 0, 1)
+
+
+def best_time(func, runs):
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def run():
+    parser = argparse.ArgumentParser(description="测量合成引擎的速度")
+    parser.add_argument('--runs', type=int, default=3, help="每种情况的测量次数（取最快一次）")
+    parser.add_argument('--size', default='2000x3000', help="每张图片摆正后的尺寸，宽x高")
+    args = parser.parse_args()
+    tile_size = tuple(int(v) for v in args.size.lower().split('x'))
+
+    worker = main.StitchWorker([], '')
+    print(f"6 张 {tile_size[0]}x{tile_size[1]} 图片，{args.runs} 次取最快（单位毫秒）")
+    print(f"{'模式':<6}{'方向':<8}{'Pillow':>10}{'NumPy':>10}{'旧NumPy':>10}")
+    for mode in ('RGB', 'L'):
+        for rotated in (False, True):
+            images, cells, size = make_batch(mode, tile_size, rotated)
+            pillow = best_time(lambda: worker.assemble_pillow(images, mode, size), args.runs)
+            numpy_engine = best_time(lambda: worker.assemble_numpy(images, cells, mode, size), args.runs)
+            strided = best_time(lambda: assemble_strided(images, cells, mode, size), args.runs)
+            direction = "旋转90度" if rotated else "竖向"
+            print(f"{mode:<6}{direction:<8}{pillow * 1000:>10.1f}{numpy_engine * 1000:>10.1f}{strided * 1000:>10.1f}")
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,71 @@
+"""测量启动时间：从导入 main 到主窗口显示所需的时间
+
+每次测量都在新的 Python 进程中进行，避免模块缓存影响结果。
+同时测量启动时就加载图像模块（旧的启动方式）作为对比。
+
+用法：
+    python benchmark_startup.py [--runs 5] [--offscreen]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+# 在子进程中执行的测量代码，输出三个耗时（秒）：导入、窗口显示、图像模块加载
+MEASURE_CODE = r"""
+import sys, time
+t0 = time.perf_counter()
+import main
+from PyQt6.QtWidgets import QApplication
+t_import = time.perf_counter()
+
+app = QApplication(sys.argv[:1])
+if EAGER:
+    main.load_image_codecs()
+window = main.ImageStitcherApp()
+window.show()
+app.processEvents()
+t_window = time.perf_counter()
+
+main.load_image_codecs()
+t_codecs = time.perf_counter()
+print(t_import - t0, t_window - t0, t_codecs - t0)
+"""
+
+
+def measure(eager, runs, env):
+    """运行若干次测量，返回每项耗时的列表"""
+    code = MEASURE_CODE.replace('EAGER', 'True' if eager else 'False')
+    results = []
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, '-c', code],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            env=env, capture_output=True, text=True, check=True
+        ).stdout
+        results.append([float(v) for v in output.split()[-3:]])
+    return list(zip(*results))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="测量图像拼接工具的启动时间")
+    parser.add_argument('--runs', type=int, default=5, help="每种方式的测量次数")
+    parser.add_argument('--offscreen', action='store_true', help="不实际显示窗口（用于没有显示器的环境）")
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    if args.offscreen:
+        env['QT_QPA_PLATFORM'] = 'offscreen'
+
+    print(f"测量次数：{args.runs}（取中位数，单位毫秒）")
+    for label, eager in (("延迟加载图像模块（当前）", False), ("启动时加载图像模块（对比）", True)):
+        import_times, window_times, codec_times = measure(eager, args.runs, env)
+        print(f"{label}：")
+        print(f"  导入 main：      {statistics.median(import_times) * 1000:8.1f}")
+        print(f"  窗口显示：       {statistics.median(window_times) * 1000:8.1f}")
+        print(f"  图像模块就绪：   {statistics.median(codec_times) * 1000:8.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,22 +1,66 @@
 import sys
 import json
 import os
+import base64
+import hashlib
+import sqlite3
+import io
+import time
+import argparse
+import tarfile
+import zipfile
 from pathlib import Path
 from PyQt6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, 
                              QHBoxLayout, QLabel, QPushButton, QFileDialog, 
-                             QProgressBar, QTabWidget, QFrame, QMessageBox)
-from PyQt6.QtCore import Qt, QThread, pyqtSignal, QSettings
+                             QProgressBar, QTabWidget, QFrame, QMessageBox,
+                             QCheckBox, QComboBox)
+from PyQt6.QtCore import Qt, QThread, pyqtSignal, QSettings, QStandardPaths, QTimer
 from PyQt6.QtGui import QDragEnterEvent, QDropEvent, QFont, QIcon, QDesktopServices
 from PyQt6.QtCore import QUrl
-from PIL import Image
-import pillow_heif
 import subprocess
+import threading
+import queue
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 
-# 注册 HEIF 支持
-pillow_heif.register_heif_opener()
+# Pillow、HEIF 插件和 NumPy 导入较慢，推迟到窗口显示之后再加载，
+# 见 load_image_codecs()
+Image = None
+np = None
 
-# 设置 Pillow 的最大像素限制（增大到更大的值）
-Image.MAX_IMAGE_PIXELS = None
+_codecs_lock = threading.Lock()
+_codecs_loaded = False
+
+
+def load_image_codecs():
+    """
+    加载图像处理相关的模块并注册 HEIF 支持
+
+    可以重复调用，只在第一次调用时加载。启动后会在后台线程中预先加载，
+    各工作线程开始处理前也会调用，确保已经加载完成。
+    """
+    global Image, np, _codecs_loaded
+    with _codecs_lock:
+        if _codecs_loaded:
+            return
+        
+        from PIL import Image as pil_image
+        import pillow_heif
+        
+        # 注册 HEIF 支持
+        pillow_heif.register_heif_opener()
+        
+        # 设置 Pillow 的最大像素限制（增大到更大的值）
+        pil_image.MAX_IMAGE_PIXELS = None
+        
+        try:
+            import numpy
+        except ImportError:  # NumPy 为可选依赖，缺失时使用 Pillow 的实现
+            numpy = None
+        
+        Image = pil_image
+        np = numpy
+        _codecs_loaded = True
 
 
 def open_folder(path):
@@ -31,21 +75,679 @@ def open_folder(path):
         print(f"打开文件夹失败: {e}")
 
 
+# 目录扫描的并发线程数（网络共享目录上主要耗时在IO等待，线程数可以比CPU核数多）
+SCAN_MAX_WORKERS = 16
+
+# 每个校验任务处理的文件数，大目录中的文件分块并发校验
+SCAN_PROBE_CHUNK = 64
+
+# 同时提交到线程池的任务数上限（线程数的倍数），其余任务在本地队列中等待
+SCAN_MAX_IN_FLIGHT_FACTOR = 4
+
+# 拼接界面文件列表最多显示的文件名数量
+MAX_LISTED_FILENAMES = 100
+
+# HEIF/HEIC 容器 ftyp 中可识别的品牌
+HEIF_BRANDS = {b'heic', b'heix', b'heim', b'heis', b'hevc', b'hevx', b'mif1', b'msf1'}
+
+
+def sniff_image_format(header):
+    """根据文件头的魔数判断图片格式，无法识别时返回 None"""
+    if header[:3] == b'\xff\xd8\xff':
+        return 'JPEG'
+    if header[:8] == b'\x89PNG\r\n\x1a\n':
+        return 'PNG'
+    if header[:2] == b'BM':
+        return 'BMP'
+    if header[:4] == b'RIFF' and header[8:12] == b'WEBP':
+        return 'WEBP'
+    if header[4:8] == b'ftyp' and header[8:12] in HEIF_BRANDS:
+        return 'HEIF'
+    if header[:4] in (b'II*\x00', b'MM\x00*'):
+        return 'TIFF'
+    return None
+
+
+def probe_image_file(path):
+    """通过魔数和文件头校验图片文件，不解码像素数据"""
+    try:
+        with open(path, 'rb') as f:
+            if sniff_image_format(f.read(16)) is None:
+                return False
+            f.seek(0)
+            # Image.open 只解析文件头，借此排除头部损坏的文件
+            with Image.open(f) as img:
+                return img.width > 0 and img.height > 0
+    except Exception:
+        return False
+
+
+def _scan_directory(path):
+    """列出单个目录下的子目录和文件"""
+    dirs, files = [], []
+    try:
+        with os.scandir(path) as it:
+            for entry in it:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        dirs.append(entry.path)
+                    elif entry.is_file():
+                        files.append(entry.path)
+                except OSError:
+                    continue
+    except OSError:
+        pass
+    return dirs, files
+
+
+def _probe_files(paths):
+    """校验一组文件，返回其中的有效图片"""
+    return [path for path in paths if probe_image_file(path)]
+
+
+def scan_image_files(paths, on_found=None, should_stop=None, max_workers=SCAN_MAX_WORKERS):
+    """
+    并发递归扫描文件和文件夹，返回其中的有效图片路径
+
+    目录列举和文件头校验都在线程池中进行，文件按 SCAN_PROBE_CHUNK 个一组校验。
+    完成的任务通过回调放入队列，每次只处理一个完成的任务，开销与未完成的任务数无关；
+    提交到线程池的任务数有上限，其余任务留在本地队列中，内存占用不随文件数增长。
+    每个任务找到的图片通过 on_found 回调分块回传。返回值的顺序是确定的：
+    直接给出的文件保持原顺序，文件夹中的图片按路径排序后依次排在其后。
+    """
+    explicit_files = []
+    valid_files = set()
+    folder_results = {}  # 顶层文件夹 -> 其中找到的图片
+    backlog = deque()  # 等待提交的任务 (is_dir, 目录或文件列表, 顶层文件夹)
+    completed = queue.Queue()
+    max_in_flight = max_workers * SCAN_MAX_IN_FLIGHT_FACTOR
+    in_flight = 0
+
+    for path in paths:
+        path = os.path.abspath(path)
+        if os.path.isdir(path):
+            folder_results.setdefault(path, [])
+            backlog.append((True, path, path))
+        elif os.path.isfile(path):
+            explicit_files.append(path)
+    for i in range(0, len(explicit_files), SCAN_PROBE_CHUNK):
+        backlog.append((False, explicit_files[i:i + SCAN_PROBE_CHUNK], None))
+
+    pool = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        while backlog or in_flight:
+            if should_stop and should_stop():
+                break
+
+            while backlog and in_flight < max_in_flight:
+                is_dir, target, root = backlog.popleft()
+                future = pool.submit(_scan_directory if is_dir else _probe_files, target)
+                future.add_done_callback(lambda f, task=(is_dir, root): completed.put((f, task)))
+                in_flight += 1
+
+            try:
+                future, (is_dir, root) = completed.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            in_flight -= 1
+
+            if is_dir:
+                dirs, files = future.result()
+                backlog.extend((True, d, root) for d in dirs)
+                backlog.extend((False, files[i:i + SCAN_PROBE_CHUNK], root)
+                               for i in range(0, len(files), SCAN_PROBE_CHUNK))
+                continue
+
+            found = future.result()
+            if root is None:
+                valid_files.update(found)
+            else:
+                folder_results[root].extend(found)
+            # 流式回传本次找到的图片
+            if found and on_found:
+                on_found(found)
+    finally:
+        # 取消后不再等待尚未开始的任务
+        pool.shutdown(wait=True, cancel_futures=True)
+
+    ordered = [f for f in explicit_files if f in valid_files]
+    for root in folder_results:
+        ordered.extend(sorted(folder_results[root]))
+    # 拖放的文件和文件夹可能有重叠，去重时保留第一次出现的位置
+    return list(dict.fromkeys(ordered))
+
+
+# EXIF 方向标签
+EXIF_ORIENTATION_TAG = 0x0112
+
+# EXIF 方向值对应的摆正操作（Image.Transpose 的成员名）
+EXIF_ORIENTATION_TRANSFORMS = {
+    2: 'FLIP_LEFT_RIGHT',
+    3: 'ROTATE_180',
+    4: 'FLIP_TOP_BOTTOM',
+    5: 'TRANSPOSE',
+    6: 'ROTATE_270',
+    7: 'TRANSVERSE',
+    8: 'ROTATE_90',
+}
+
+# 每种 transpose 操作对像素坐标的作用矩阵 (a, b, c, d)：
+# x' = a*x + b*y, y' = c*x + d*y（以图片中心为原点，y 轴向下）
+TRANSPOSE_MATRICES = {
+    None: (1, 0, 0, 1),
+    'FLIP_LEFT_RIGHT': (-1, 0, 0, 1),
+    'FLIP_TOP_BOTTOM': (1, 0, 0, -1),
+    'ROTATE_90': (0, 1, -1, 0),
+    'ROTATE_180': (-1, 0, 0, -1),
+    'ROTATE_270': (0, -1, 1, 0),
+    'TRANSPOSE': (0, 1, 1, 0),
+    'TRANSVERSE': (0, -1, -1, 0),
+}
+MATRIX_TRANSPOSES = {matrix: op for op, matrix in TRANSPOSE_MATRICES.items()}
+
+
+def get_exif_orientation(img):
+    """读取图片的 EXIF 方向值（只解析文件头），无效时返回 1"""
+    try:
+        orientation = int(img.getexif().get(EXIF_ORIENTATION_TAG, 1))
+    except Exception:
+        return 1
+    return orientation if orientation in EXIF_ORIENTATION_TRANSFORMS else 1
+
+
+def compose_transforms(first, second):
+    """把先执行 first 再执行 second 的两个 transpose 合并为一个（None 表示不变换）"""
+    a1, b1, c1, d1 = TRANSPOSE_MATRICES[first]
+    a2, b2, c2, d2 = TRANSPOSE_MATRICES[second]
+    matrix = (a2 * a1 + b2 * c1, a2 * b1 + b2 * d1,
+              c2 * a1 + d2 * c1, c2 * b1 + d2 * d1)
+    return MATRIX_TRANSPOSES[matrix]
+
+
+def invert_transform(transform):
+    """求 transpose 操作的逆操作"""
+    a, b, c, d = TRANSPOSE_MATRICES[transform]
+    return MATRIX_TRANSPOSES[(a, c, b, d)]
+
+
+def swaps_axes(transform):
+    """transpose 操作是否会交换宽高"""
+    return TRANSPOSE_MATRICES[transform][0] == 0
+
+
+# 拼接画布支持的模式及对应的白色背景
+CANVAS_BACKGROUNDS = {
+    'L': 255,
+    'LA': (255, 255),
+    'RGB': (255, 255, 255),
+    'RGBA': (255, 255, 255, 255),
+    'CMYK': (0, 0, 0, 0),
+    'I;16': 65535,
+}
+
+# 各画布模式的通道数
+CANVAS_CHANNELS = {'L': 1, 'LA': 2, 'RGB': 3, 'RGBA': 4, 'CMYK': 4, 'I;16': 1}
+
+# 各画布模式的输出格式：JPEG 只支持 L/RGB/CMYK，带透明通道和16位的用 PNG 无损保存
+CANVAS_FORMATS = {
+    'L': ('JPEG', '.jpg'),
+    'RGB': ('JPEG', '.jpg'),
+    'CMYK': ('JPEG', '.jpg'),
+    'LA': ('PNG', '.png'),
+    'RGBA': ('PNG', '.png'),
+    'I;16': ('PNG', '.png'),
+}
+
+# 各格式可以直接保存的模式
+JPEG_MODES = {'L', 'RGB', 'CMYK'}
+PNG_MODES = {'1', 'L', 'LA', 'P', 'RGB', 'RGBA', 'I', 'I;16'}
+
+
+def normalize_mode(img):
+    """把图片模式归一化为画布支持的模式之一（不丢失位深和透明通道）"""
+    mode = img.mode
+    if mode == '1':
+        return 'L'
+    if mode == 'P':
+        return 'RGBA' if 'transparency' in img.info else 'RGB'
+    if mode == 'PA':
+        return 'RGBA'
+    if mode == 'I' or mode.startswith('I;16'):
+        return 'I;16'
+    if mode in CANVAS_BACKGROUNDS:
+        return mode
+    return 'RGB'
+
+
+def choose_canvas_mode(modes):
+    """根据一批图片的模式选择能容纳全部图片的画布模式"""
+    modes = set(modes)
+    if len(modes) == 1:
+        return modes.pop()
+    if modes <= {'L', 'I;16'}:
+        return 'I;16'
+    if modes <= {'L', 'LA'}:
+        return 'LA'
+    if modes & {'LA', 'RGBA'}:
+        return 'RGBA'
+    if 'CMYK' in modes:
+        # L/RGB 写入 CMYK 画布只是按通道取反，拆分时可以逐值还原
+        return 'CMYK'
+    return 'RGB'
+
+
+# 各模式的图片可以无损放入的画布模式，其余组合（如16位灰度放入 RGB 画布）会损失精度
+LOSSLESS_CANVAS_MODES = {
+    'L': {'L', 'LA', 'RGB', 'RGBA', 'CMYK', 'I;16'},
+    'LA': {'LA', 'RGBA'},
+    'RGB': {'RGB', 'RGBA', 'CMYK'},
+    'RGBA': {'RGBA'},
+    'CMYK': {'CMYK'},
+    'I;16': {'I;16'},
+}
+
+# 拆分时可以还原的原始模式，其他模式还原为画布中记录的模式
+RESTORABLE_SOURCE_MODES = {'1', 'P', 'I'} | set(LOSSLESS_CANVAS_MODES)
+
+
+def describe_source_mode(img):
+    """记录原始图片的模式，调色板图片同时记录调色板，以便拆分时精确还原"""
+    if img.mode != 'P':
+        return {'source_mode': img.mode}
+    transparency = img.info.get('transparency')
+    if transparency is not None and not isinstance(transparency, int):
+        # 逐项透明度的调色板无法从 RGBA 像素唯一还原，保持 RGBA
+        return {'source_mode': 'RGBA'}
+    info = {
+        'source_mode': 'P',
+        'palette': base64.b64encode(bytes(img.getpalette())).decode('ascii'),
+    }
+    if transparency is not None:
+        info['transparency'] = transparency
+    return info
+
+
+def restore_source_mode(img, item):
+    """把拆分出的图片还原为 describe_source_mode 记录的原始模式"""
+    mode = item.get('source_mode', item.get('mode'))
+    if mode not in RESTORABLE_SOURCE_MODES:
+        mode = item.get('mode')
+    if not mode:
+        return img
+    if mode == '1':
+        # 原图只有 0 和 255 两种值，按阈值还原而不做抖动
+        return convert_to_mode(img, 'L').convert('1', dither=Image.Dither.NONE)
+    if mode == 'P' and 'palette' in item:
+        palette = Image.new('P', (1, 1))
+        palette.putpalette(base64.b64decode(item['palette']))
+        restored = convert_to_mode(img, 'RGB').quantize(palette=palette, dither=Image.Dither.NONE)
+        transparency = item.get('transparency')
+        if transparency is not None:
+            if 'A' in img.getbands():
+                restored.paste(transparency, mask=img.getchannel('A').point(lambda a: 255 if a == 0 else 0))
+            restored.info['transparency'] = transparency
+        return restored
+    if mode == 'P':
+        mode = item.get('mode') or 'RGB'
+    return convert_to_mode(img, mode)
+
+
+def widen_to_16bit(img):
+    """8位灰度扩展到16位灰度（v * 257，可被 narrow_to_8bit 无损还原）"""
+    if np is not None:
+        arr = np.asarray(img.convert('L'), dtype=np.uint16) * 257
+        return Image.fromarray(arr)
+    return img.convert('I').point(lambda v: v * 257).convert('I;16')
+
+
+def narrow_to_8bit(img):
+    """16位灰度缩减到8位灰度（四舍五入 v / 257）"""
+    if np is not None:
+        arr = np.clip(np.asarray(img, dtype=np.int64), 0, 65535)
+        return Image.fromarray(((arr * 255 + 32767) // 65535).astype(np.uint8))
+    # 加 0.5 后截断即四舍五入，与 NumPy 路径的结果逐值一致
+    return img.convert('I').point(lambda v: v / 257 + 0.5).convert('L')
+
+
+def convert_to_mode(img, mode):
+    """把图片转换为目标模式，16位灰度与8位模式之间按比例缩放而不是截断"""
+    if img.mode == mode:
+        return img
+    if mode == 'I;16':
+        if img.mode == 'I' or img.mode.startswith('I;16'):
+            return img.convert('I;16')
+        return widen_to_16bit(img)
+    if img.mode == 'I' or img.mode.startswith('I;16'):
+        img = narrow_to_8bit(img)
+        if img.mode == mode:
+            return img
+    return img.convert(mode)
+
+
+# 校样模式可选的缩小比例
+PROOF_SCALES = (2, 4, 8)
+
+# 校样输出的 JPEG 质量
+PROOF_JPEG_QUALITY = 85
+
+
+def reduce_for_proof(img, transform, width, height, scale):
+    """
+    按校样比例缩小解码图片
+
+    width/height 为摆正后的原始尺寸。JPEG 通过 draft 直接按 1/2～1/8 比例解码，
+    HEIF 通过 draft 选用内嵌缩略图，其余格式解码后再缩小。
+    """
+    target = (max(1, width // scale), max(1, height // scale))
+    if swaps_axes(transform):
+        target = target[::-1]
+    img.draft(img.mode, target)
+    if img.size != target:
+        # Image.reduce 不支持16位灰度，这类图片直接按双线性缩放
+        reducing_gap = None if img.mode.startswith('I;16') else 2.0
+        img = img.resize(target, Image.Resampling.BILINEAR, reducing_gap=reducing_gap)
+    return img
+
+
+# 像素校验值使用的哈希算法，记录在 JSON 中的格式为 "算法:十六进制摘要"
+PIXEL_DIGEST_ALGORITHM = 'blake2b'
+
+# 校验时每次读取的行数，避免一次性复制整张图片
+DIGEST_BAND_ROWS = 256
+
+
+def new_pixel_digest():
+    """创建像素校验用的哈希对象"""
+    return hashlib.blake2b(digest_size=16)
+
+
+def format_pixel_digest(digest):
+    return f"{PIXEL_DIGEST_ALGORITHM}:{digest.hexdigest()}"
+
+
+def image_region_digest(image, box, mode):
+    """按行带分块计算图片区域在指定模式下的像素校验值"""
+    x0, y0, x1, y1 = box
+    digest = new_pixel_digest()
+    for top in range(y0, y1, DIGEST_BAND_ROWS):
+        band = image.crop((x0, top, x1, min(top + DIGEST_BAND_ROWS, y1)))
+        digest.update(convert_to_mode(band, mode).tobytes())
+    return format_pixel_digest(digest)
+
+
+def verify_tiles(image, metadata, max_workers=SCAN_MAX_WORKERS):
+    """
+    并行校验拼接图中每个区域的像素校验值
+
+    有损格式（JPEG）的拼接图校验保存后重新解码得到的像素（encoded_digest），
+    无损格式校验合成时的画布像素（pixel_digest）。
+    返回与 metadata 一一对应的状态列表：'ok'、'mismatch' 或 'missing'（JSON 中没有校验值）。
+    """
+    # 先完整解码，多个线程之后只读取像素
+    image.load()
+
+    def check(item):
+        if 'encoded_digest' in item:
+            expected, mode = item['encoded_digest'], image.mode
+        else:
+            expected, mode = item.get('pixel_digest'), item.get('digest_mode', image.mode)
+        if not expected or not expected.startswith(f"{PIXEL_DIGEST_ALGORITHM}:"):
+            return 'missing'
+        box = (item['x'], item['y'], item['x'] + item['width'], item['y'] + item['height'])
+        actual = image_region_digest(image, box, mode)
+        return 'ok' if actual == expected else 'mismatch'
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        return list(pool.map(check, metadata))
+
+
+def encode_icc_profile(profile):
+    """ICC 配置文件编码为可写入 JSON 的字符串"""
+    return base64.b64encode(profile).decode('ascii')
+
+
+def decode_icc_profile(text):
+    """从 JSON 字符串还原 ICC 配置文件"""
+    return base64.b64decode(text)
+
+
+# 感知哈希的汉明距离不超过该值时视为近似重复
+NEAR_DUPLICATE_DISTANCE = 4
+
+# 哈希索引的版本，感知哈希的算法变化时递增，旧的缓存结果会被清除
+HASH_INDEX_VERSION = 2
+
+# 64位感知哈希分段的位宽：距离不超过4时，5段中至少有一段完全相同
+PHASH_BANDS = ((0, 13), (13, 13), (26, 13), (39, 13), (52, 12))
+
+
+def get_hash_index_path():
+    """哈希索引数据库的保存位置"""
+    base_dir = QStandardPaths.writableLocation(QStandardPaths.StandardLocation.GenericDataLocation)
+    return os.path.join(base_dir or os.path.expanduser('~'), 'ImageStitcher', 'hash_index.sqlite3')
+
+
+def file_content_hash(path):
+    """计算文件内容的 SHA-256，用于识别完全相同的图片"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def perceptual_hash(path):
+    """
+    计算64位差值哈希（dHash），用于识别近似重复的图片
+
+    JPEG 通过 draft 模式按 1/8 比例解码，不需要解码完整分辨率。
+    先按 EXIF 方向摆正，16位图片按比例缩减到8位而不是截断。
+    """
+    with Image.open(path) as img:
+        transform = EXIF_ORIENTATION_TRANSFORMS.get(get_exif_orientation(img))
+        img.draft('L', (64, 64))
+        # 缩小到摆正前对应的尺寸后再做 transpose，只需重排 72 个像素
+        size = (8, 9) if swaps_axes(transform) else (9, 8)
+        small = convert_to_mode(img, 'L').resize(size, Image.Resampling.BOX)
+        if transform is not None:
+            small = small.transpose(Image.Transpose[transform])
+    pixels = small.tobytes()
+    value = 0
+    for row in range(8):
+        for col in range(8):
+            left = pixels[row * 9 + col]
+            right = pixels[row * 9 + col + 1]
+            value = (value << 1) | (1 if left > right else 0)
+    return value
+
+
+def compute_image_hashes(path):
+    """计算图片的内容哈希和感知哈希，感知哈希失败时为 None"""
+    content_hash = file_content_hash(path)
+    try:
+        phash = perceptual_hash(path)
+    except Exception:
+        phash = None
+    return content_hash, phash
+
+
+class HashIndex:
+    """持久化的图片哈希索引，按路径、文件大小和修改时间缓存计算结果"""
+
+    def __init__(self, db_path):
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self.conn = sqlite3.connect(db_path)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS hashes ("
+            "path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, "
+            "content_hash TEXT, phash TEXT)"
+        )
+        version = self.conn.execute("PRAGMA user_version").fetchone()[0]
+        if version != HASH_INDEX_VERSION:
+            self.conn.execute("DELETE FROM hashes")
+            self.conn.execute(f"PRAGMA user_version = {HASH_INDEX_VERSION}")
+            self.conn.commit()
+
+    def lookup(self, path, size, mtime_ns):
+        """查询缓存的哈希，文件已变化或未缓存时返回 None"""
+        row = self.conn.execute(
+            "SELECT content_hash, phash FROM hashes WHERE path = ? AND size = ? AND mtime_ns = ?",
+            (path, size, mtime_ns)
+        ).fetchone()
+        if row is None:
+            return None
+        return row[0], (int(row[1], 16) if row[1] else None)
+
+    def store_many(self, rows):
+        """批量写入 (path, size, mtime_ns, content_hash, phash)"""
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO hashes VALUES (?, ?, ?, ?, ?)",
+            [(path, size, mtime_ns, content_hash, format(phash, '016x') if phash is not None else None)
+             for path, size, mtime_ns, content_hash, phash in rows]
+        )
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+
+def find_duplicates(paths, index=None, max_workers=SCAN_MAX_WORKERS,
+                    near_distance=NEAR_DUPLICATE_DISTANCE):
+    """
+    查找重复和近似重复的图片
+
+    返回 [(重复图片, 保留的图片, 'exact' 或 'near'), ...]，每组重复中保留最先出现的一张。
+    已缓存在 index 中且未修改的文件不会重新计算哈希。
+    """
+    hashes = {}
+    to_compute = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        cached = index.lookup(path, stat.st_size, stat.st_mtime_ns) if index else None
+        if cached:
+            hashes[path] = cached
+        else:
+            to_compute.append((path, stat.st_size, stat.st_mtime_ns))
+
+    if to_compute:
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            results = list(pool.map(lambda item: compute_image_hashes(item[0]), to_compute))
+        for (path, _, _), result in zip(to_compute, results):
+            hashes[path] = result
+        if index:
+            index.store_many([item + result for item, result in zip(to_compute, results)])
+
+    duplicates = []
+    seen_content = {}
+    buckets = [{} for _ in PHASH_BANDS]  # 每段取值 -> 已保留的图片
+    kept_phash = {}
+    for path in paths:
+        if path not in hashes:
+            continue
+        content_hash, phash = hashes[path]
+        if content_hash in seen_content:
+            duplicates.append((path, seen_content[content_hash], 'exact'))
+            continue
+        seen_content[content_hash] = path
+        if phash is None:
+            continue
+
+        # 只和至少有一段哈希完全相同的图片比较汉明距离
+        match = None
+        keys = [(phash >> shift) & ((1 << width) - 1) for shift, width in PHASH_BANDS]
+        for bucket, key in zip(buckets, keys):
+            for candidate in bucket.get(key, ()):
+                if bin(phash ^ kept_phash[candidate]).count('1') <= near_distance:
+                    match = candidate
+                    break
+            if match:
+                break
+        if match:
+            duplicates.append((path, match, 'near'))
+            continue
+
+        kept_phash[path] = phash
+        for bucket, key in zip(buckets, keys):
+            bucket.setdefault(key, []).append(path)
+    return duplicates
+
+
 class StitchWorker(QThread):
     """拼接图像的工作线程"""
     progress_updated = pyqtSignal(int)
     batch_progress = pyqtSignal(int, int, int)  # batch_index, total_batches, progress
     finished = pyqtSignal(bool, str, list)  # success, message, output_files
     
-    def __init__(self, image_paths, output_path):
+    def __init__(self, image_paths, output_path, use_numpy=False, skip_duplicates=False, proof_scale=1,
+                 container=None):
         super().__init__()
         self.image_paths = image_paths
         self.output_path = output_path
+        self.skip_duplicates = skip_duplicates
+        self.proof_scale = proof_scale  # 校样缩小比例，1 表示原始分辨率
+        self.container = container  # 'tiff' 表示所有批次写入一个多页 TIFF，None 表示每批单独保存
+        # 默认使用 Pillow 合成画布：benchmark_assembly.py 的测量中 Pillow 的 paste
+        # 不慢于 NumPy 引擎，NumPy 引擎需要显式启用
+        self.use_numpy = use_numpy
     
     def run(self):
         try:
+            load_image_codecs()
+            if np is None:
+                self.use_numpy = False
+            
             output_files = []
-            num_images = len(self.image_paths)
+            image_paths = self.image_paths
+            
+            # 拼接前去除重复和近似重复的图片
+            duplicates = []
+            if self.skip_duplicates:
+                duplicates = self.find_duplicates(image_paths)
+                skipped = {dup for dup, _, _ in duplicates}
+                image_paths = [p for p in image_paths if p not in skipped]
+            duplicate_note = self.format_duplicates(duplicates)
+            
+            num_images = len(image_paths)
+            lossy_files = []  # 画布模式无法无损容纳的图片
+            
+            # 校样文件名加上 _proof 后缀，避免覆盖最终输出
+            output_path = self.output_path
+            if self.proof_scale > 1:
+                output_path = str(Path(output_path).with_name(f"{Path(output_path).stem}_proof.jpg"))
+            
+            # 多页 TIFF：每批作为一页依次追加写入，内存中只保留当前批次
+            if self.container == 'tiff':
+                from PIL import TiffImagePlugin
+                container_path = str(Path(output_path).with_suffix('.tif'))
+                page_writer = TiffImagePlugin.AppendingTiffWriter(container_path, True)
+                completed = False
+                try:
+                    batch_count = max(1, (num_images + 5) // 6)
+                    for batch_idx in range(batch_count):
+                        batch_images = image_paths[batch_idx * 6:(batch_idx + 1) * 6]
+                        result = self.process_batch(batch_images, container_path, batch_idx, batch_count,
+                                                    page_writer=page_writer)
+                        if not result['success']:
+                            self.finished.emit(False, result['message'], [])
+                            return
+                        lossy_files.extend(result['lossy_files'])
+                    completed = True
+                finally:
+                    page_writer.close()
+                    # 删除未完成的多页 TIFF，避免留下缺页但看起来完整的文件
+                    if not completed:
+                        try:
+                            os.remove(container_path)
+                        except OSError:
+                            pass
+                
+                self.finished.emit(True, f"拼接成功！共 {batch_count} 页，已保存至：{container_path}"
+                                         f"{duplicate_note}{self.format_lossy(lossy_files)}",
+                                   [container_path])
+                return
             
             # 如果超过6张，分批处理
             if num_images > 6:
@@ -54,11 +756,11 @@ class StitchWorker(QThread):
                 for batch_idx in range(batch_count):
                     start_idx = batch_idx * 6
                     end_idx = min(start_idx + 6, num_images)
-                    batch_images = self.image_paths[start_idx:end_idx]
+                    batch_images = image_paths[start_idx:end_idx]
                     
                     # 生成批次文件名
-                    output_dir = os.path.dirname(self.output_path)
-                    base_name = Path(self.output_path).stem
+                    output_dir = os.path.dirname(output_path)
+                    base_name = Path(output_path).stem
                     if batch_count > 1:
                         batch_suffix = f"_part{batch_idx + 1}"
                     else:
@@ -72,22 +774,58 @@ class StitchWorker(QThread):
                         return
                     
                     output_files.extend(result['output_files'])
+                    lossy_files.extend(result['lossy_files'])
                     self.batch_progress.emit(batch_idx + 1, batch_count, 100)
                 
-                self.finished.emit(True, f"拼接成功！共生成 {len(output_files)} 个文件", output_files)
+                self.finished.emit(True, f"拼接成功！共生成 {len(output_files)} 个文件{duplicate_note}"
+                                         f"{self.format_lossy(lossy_files)}", output_files)
             else:
                 # 单批处理
-                result = self.process_batch(self.image_paths, self.output_path, 0, 1)
+                result = self.process_batch(image_paths, output_path, 0, 1)
                 if result['success']:
-                    self.finished.emit(True, f"拼接成功！已保存至：{self.output_path}", result['output_files'])
+                    self.finished.emit(True, f"拼接成功！已保存至：{result['output_files'][0]}{duplicate_note}"
+                                             f"{self.format_lossy(result['lossy_files'])}", result['output_files'])
                 else:
                     self.finished.emit(False, result['message'], [])
             
         except Exception as e:
             self.finished.emit(False, f"拼接失败：{str(e)}", [])
     
-    def process_batch(self, image_paths, output_path, batch_idx, batch_count):
-        """处理单个批次的图片"""
+    def find_duplicates(self, image_paths):
+        """使用持久化哈希索引查找重复图片，索引不可用时直接计算"""
+        try:
+            index = HashIndex(get_hash_index_path())
+        except (OSError, sqlite3.Error) as e:
+            print(f"打开哈希索引失败: {e}")
+            return find_duplicates(image_paths)
+        try:
+            return find_duplicates(image_paths, index)
+        finally:
+            index.close()
+    
+    def format_duplicates(self, duplicates):
+        """生成跳过重复图片的说明文字"""
+        if not duplicates:
+            return ""
+        kind_names = {'exact': '完全相同', 'near': '近似'}
+        lines = [f"  - {os.path.basename(dup)}（与 {os.path.basename(kept)} {kind_names[kind]}）"
+                 for dup, kept, kind in duplicates[:5]]
+        if len(duplicates) > 5:
+            lines.append(f"  ... 还有 {len(duplicates) - 5} 张")
+        return f"\n已跳过 {len(duplicates)} 张重复图片：\n" + "\n".join(lines)
+    
+    def format_lossy(self, lossy_files):
+        """生成画布模式损失精度的提示文字"""
+        if not lossy_files:
+            return ""
+        lines = [f"  - {name}" for name in lossy_files[:5]]
+        if len(lossy_files) > 5:
+            lines.append(f"  ... 还有 {len(lossy_files) - 5} 张")
+        return (f"\n注意：{len(lossy_files)} 张图片与同批其他图片的模式无法共用无损画布"
+                f"（如16位灰度与彩色、CMYK与透明图片混合），拆分后会损失位深或色彩：\n" + "\n".join(lines))
+    
+    def process_batch(self, image_paths, output_path, batch_idx, batch_count, page_writer=None):
+        """处理单个批次的图片，page_writer 不为空时作为一页写入多页 TIFF"""
         try:
             # 读取所有图片并保存原始信息
             self.batch_progress.emit(batch_idx + 1, batch_count, 10)
@@ -96,12 +834,20 @@ class StitchWorker(QThread):
             
             for i, img_path in enumerate(image_paths):
                 img = Image.open(img_path)
-                
-                # 检查并修正图片方向：确保所有图片都是纵向（高度 > 宽度）
-                # 如果是横向图片，则旋转90度变为纵向
-                if img.width > img.height:
-                    img = img.rotate(90, expand=True)
-                
+
+                # 先按 EXIF 方向摆正，再确保所有图片都是纵向（高度 > 宽度）：
+                # 横向图片需要逆时针旋转90度。两步合并为一次 transpose，
+                # 只做像素重排而不走 rotate 的重采样路径；变换在写入画布时才执行
+                orientation = get_exif_orientation(img)
+                transform = EXIF_ORIENTATION_TRANSFORMS.get(orientation)
+                width, height = img.size
+                if swaps_axes(transform):
+                    width, height = height, width
+                was_rotated = width > height
+                if was_rotated:
+                    transform = compose_transforms(transform, 'ROTATE_90')
+                    width, height = height, width
+
                 # 获取图片的DPI信息，并转换为普通数值
                 dpi = img.info.get('dpi', (300, 300))
                 
@@ -121,18 +867,25 @@ class StitchWorker(QThread):
                 dpi_x = convert_dpi(dpi[0])
                 dpi_y = convert_dpi(dpi[1])
                 dpi_info[i] = (dpi_x, dpi_y)
-                
-                # 检查原始图片方向
-                original_img = Image.open(img_path)
-                was_rotated = (original_img.width > original_img.height)
-                
+
+                source = describe_source_mode(img)
+
+                # 校样模式下按缩小后的尺寸解码
+                if self.proof_scale > 1:
+                    img = reduce_for_proof(img, transform, width, height, self.proof_scale)
+
                 images.append({
                     'path': img_path,
                     'filename': os.path.basename(img_path),
                     'image': img,
-                    'width': img.width,
-                    'height': img.height,
-                    'was_rotated': was_rotated
+                    'width': width,
+                    'height': height,
+                    'was_rotated': was_rotated,
+                    'orientation': orientation,
+                    'transform': transform,
+                    'mode': normalize_mode(img),
+                    'source': source,
+                    'icc_profile': img.info.get('icc_profile')
                 })
                 progress = 10 + int((i / len(image_paths)) * 20)
                 self.batch_progress.emit(batch_idx + 1, batch_count, progress)
@@ -164,8 +917,15 @@ class StitchWorker(QThread):
             total_width = sum(col_max_widths)
             total_height = sum(row_max_heights)
             
-            # 创建白色背景的大图
-            combined = Image.new('RGB', (total_width, total_height), 'white')
+            # 根据本批图片选择画布模式，保持位深和透明通道
+            canvas_mode = choose_canvas_mode(img_info['mode'] for img_info in images)
+            lossy_files = [img_info['filename'] for img_info in images
+                           if canvas_mode not in LOSSLESS_CANVAS_MODES[img_info['mode']]]
+            
+            # 所有图片使用同一个 ICC 配置文件时，拼接图直接嵌入该配置文件；
+            # 与之不同的配置文件逐张记录在 JSON 中
+            profiles = {img_info['icc_profile'] for img_info in images}
+            canvas_profile = profiles.pop() if len(profiles) == 1 else None
             
             # 计算拼接图的DPI（使用第一张图片的DPI作为参考）
             if dpi_info:
@@ -173,63 +933,393 @@ class StitchWorker(QThread):
             else:
                 output_dpi = (300, 300)
             
-            # 计算每张图在合成图中的位置并记录元数据
-            metadata = []
+            # 计算每张图在合成图中的位置
+            cells = []  # 每个格子的区域 (x, y, w, h)
             y_offset = 0
-            current_row = 0
+            for row in range(rows):
+                x_offset = 0
+                for col in range(cols):
+                    cells.append((x_offset, y_offset, col_max_widths[col], row_max_heights[row]))
+                    x_offset += col_max_widths[col]
+                y_offset += row_max_heights[row]
+            
             for i, img_info in enumerate(images):
                 row = i // cols
                 col = i % cols
-                
-                # 如果是新的一行，更新y坐标
-                if row != current_row:
-                    y_offset += row_max_heights[current_row]
-                    current_row = row
-                
-                # 计算当前位置
-                x = sum(col_max_widths[:col])
-                y = y_offset
+                x, y, _, _ = cells[i]
                 
                 # 居中放置图片
-                paste_x = x + (col_max_widths[col] - img_info['width']) // 2
-                paste_y = y + (row_max_heights[row] - img_info['height']) // 2
-                
-                # 粘贴图片
-                combined.paste(img_info['image'], (paste_x, paste_y))
-                
-                # 记录元数据（记录实际粘贴位置、DPI信息和旋转状态）
+                img_info['x'] = x + (col_max_widths[col] - img_info['width']) // 2
+                img_info['y'] = y + (row_max_heights[row] - img_info['height']) // 2
+            
+            # 校样模式：布局按原始分辨率计算，再把所有坐标按比例缩小，
+            # 保证与最终输出的排列完全一致
+            scale = self.proof_scale
+            if scale > 1:
+                cells = [(x // scale, y // scale, (x + w) // scale - x // scale, (y + h) // scale - y // scale)
+                         for x, y, w, h in cells]
+                for img_info in images:
+                    img_info['x'] //= scale
+                    img_info['y'] //= scale
+                    img_info['width'] = max(1, img_info['width'] // scale)
+                    img_info['height'] = max(1, img_info['height'] // scale)
+                total_width = max(1, total_width // scale)
+                total_height = max(1, total_height // scale)
+                output_dpi = tuple(max(1, v // scale) for v in output_dpi)
+                dpi_info = {i: tuple(max(1, v // scale) for v in dpi) for i, dpi in dpi_info.items()}
+            
+            # 记录元数据（记录实际粘贴位置、DPI信息、旋转状态和方向变换）
+            metadata = []
+            for i, img_info in enumerate(images):
                 metadata.append({
                     'filename': img_info['filename'],
-                    'x': paste_x,
-                    'y': paste_y,
+                    'x': img_info['x'],
+                    'y': img_info['y'],
                     'width': img_info['width'],
                     'height': img_info['height'],
                     'dpi': list(dpi_info[i]) if i in dpi_info else [300, 300],
-                    'was_rotated': img_info.get('was_rotated', False)
+                    'was_rotated': img_info.get('was_rotated', False),
+                    'orientation': img_info.get('orientation', 1),
+                    'transform': img_info['transform'],
+                    'mode': img_info['mode']
                 })
-                
-                progress = 40 + int(((i + 1) / num_images) * 30)
-                self.progress_updated.emit(progress)
+                if img_info['source']['source_mode'] != img_info['mode']:
+                    metadata[-1].update(img_info['source'])
+                if scale > 1:
+                    metadata[-1]['proof_scale'] = scale
+                if img_info['icc_profile'] and img_info['icc_profile'] != canvas_profile:
+                    metadata[-1]['icc_profile'] = encode_icc_profile(img_info['icc_profile'])
+            
+            # 合成大图
+            if self.use_numpy:
+                combined = self.assemble_numpy(images, cells, canvas_mode, (total_width, total_height))
+            else:
+                combined = self.assemble_pillow(images, canvas_mode, (total_width, total_height))
+            
+            # 记录每张图在画布中的像素校验值，拆分时可用于校验
+            for item, img_info in zip(metadata, images):
+                item['pixel_digest'] = img_info['pixel_digest']
+                item['digest_mode'] = canvas_mode
             
             self.progress_updated.emit(70)
             
-            # 保存为高质量 JPG，保持DPI
-            jpg_path = Path(output_path)
-            if jpg_path.suffix.lower() != '.jpg':
-                jpg_path = jpg_path.with_suffix('.jpg')
+            if page_writer is not None:
+                # 写入多页 TIFF 的一页（无损压缩），坐标表以 JSON 嵌入该页的 ImageDescription
+                page_options = {
+                    'dpi': output_dpi,
+                    'compression': CONTAINER_TIFF_COMPRESSION,
+                    'description': json.dumps(metadata, ensure_ascii=True),
+                }
+                if canvas_profile:
+                    page_options['icc_profile'] = canvas_profile
+                combined.save(page_writer, 'TIFF', **page_options)
+                page_writer.newFrame()
+                self.batch_progress.emit(batch_idx + 1, batch_count, 100)
+                return {'success': True, 'output_files': [output_path], 'lossy_files': lossy_files}
             
-            combined.save(str(jpg_path), 'JPEG', quality=100, subsampling=0, dpi=output_dpi)
+            # 保存拼接图，保持DPI和ICC配置文件：
+            # 8位图片保存为高质量 JPG，带透明通道或16位的图片保存为无损 PNG
+            image_format, ext = CANVAS_FORMATS[canvas_mode]
+            image_path = Path(output_path).with_suffix(ext)
+            save_options = {'dpi': output_dpi}
+            if canvas_profile:
+                save_options['icc_profile'] = canvas_profile
+            if scale > 1:
+                # 校样只求快速编码
+                if image_format == 'JPEG':
+                    save_options['quality'] = PROOF_JPEG_QUALITY
+                else:
+                    save_options['compress_level'] = 1
+            elif image_format == 'JPEG':
+                save_options.update(quality=100, subsampling=0)
+            
+            combined.save(str(image_path), image_format, **save_options)
+            
+            # 有损格式保存后重新解码一次，记录编码后的像素校验值，拆分时据此校验
+            if image_format == 'JPEG':
+                with Image.open(image_path) as encoded:
+                    encoded.load()
+                    for item in metadata:
+                        box = (item['x'], item['y'], item['x'] + item['width'], item['y'] + item['height'])
+                        item['encoded_digest'] = image_region_digest(encoded, box, encoded.mode)
             
             # 保存元数据 JSON
-            json_path = jpg_path.with_suffix('.json')
+            json_path = image_path.with_suffix('.json')
             with open(json_path, 'w', encoding='utf-8') as f:
                 json.dump(metadata, f, ensure_ascii=False, indent=2)
             
             self.batch_progress.emit(batch_idx + 1, batch_count, 100)
-            return {'success': True, 'output_files': [str(jpg_path), str(json_path)]}
+            return {'success': True, 'output_files': [str(image_path), str(json_path)],
+                    'lossy_files': lossy_files}
             
         except Exception as e:
             return {'success': False, 'message': str(e)}
+    
+    def assemble_pillow(self, images, canvas_mode, size):
+        """使用 Pillow 逐张 paste 合成大图"""
+        # 创建白色背景的大图
+        combined = Image.new(canvas_mode, size, CANVAS_BACKGROUNDS[canvas_mode])
+        
+        for i, img_info in enumerate(images):
+            tile = img_info['image']
+            if img_info['transform'] is not None:
+                tile = tile.transpose(Image.Transpose[img_info['transform']])
+            tile = convert_to_mode(tile, canvas_mode)
+            combined.paste(tile, (img_info['x'], img_info['y']))
+            img_info['pixel_digest'] = image_region_digest(tile, (0, 0) + tile.size, canvas_mode)
+            
+            progress = 40 + int(((i + 1) / len(images)) * 30)
+            self.progress_updated.emit(progress)
+        
+        return combined
+    
+    def assemble_numpy(self, images, cells, canvas_mode, size):
+        """
+        使用 NumPy 合成大图
+
+        画布预先分配为一整块连续数组，背景只填充图片没有覆盖的空白区域。
+        方向变换由 Pillow 的 transpose 完成（按跨步数组视图写入要慢得多），
+        每张图片导出一次原始字节，同一份字节用于计算像素校验值并写入画布切片。
+        RGB 画布按 Pillow 内部的 RGBX 布局分配，交给编码器时不需要再复制整张画布。
+        """
+        total_width, total_height = size
+        buffer_mode = 'RGBX' if canvas_mode == 'RGB' else canvas_mode
+        channels = 4 if buffer_mode == 'RGBX' else CANVAS_CHANNELS[canvas_mode]
+        shape = (total_height, total_width) if channels == 1 else (total_height, total_width, channels)
+        dtype = np.uint16 if canvas_mode == 'I;16' else np.uint8
+        canvas = np.empty(shape, dtype=dtype)
+        background = CANVAS_BACKGROUNDS[canvas_mode]
+        if buffer_mode == 'RGBX':
+            background += (255,)
+        
+        for i, (cell_x, cell_y, cell_w, cell_h) in enumerate(cells):
+            if i >= len(images):
+                # 没有图片的格子整体填充背景
+                canvas[cell_y:cell_y + cell_h, cell_x:cell_x + cell_w] = background
+                continue
+            
+            img_info = images[i]
+            x, y, w, h = img_info['x'], img_info['y'], img_info['width'], img_info['height']
+            
+            # 填充格子中图片四周的空白
+            canvas[cell_y:y, cell_x:cell_x + cell_w] = background
+            canvas[y + h:cell_y + cell_h, cell_x:cell_x + cell_w] = background
+            canvas[y:y + h, cell_x:x] = background
+            canvas[y:y + h, x + w:cell_x + cell_w] = background
+            
+            tile = img_info['image']
+            if img_info['transform'] is not None:
+                tile = tile.transpose(Image.Transpose[img_info['transform']])
+            tile = convert_to_mode(tile, canvas_mode)
+            data = tile.tobytes()
+            digest = new_pixel_digest()
+            digest.update(data)
+            img_info['pixel_digest'] = format_pixel_digest(digest)
+            if buffer_mode == 'RGBX':
+                data = tile.tobytes('raw', 'RGBX')
+            region = canvas[y:y + h, x:x + w]
+            region[...] = np.frombuffer(data, dtype=dtype).reshape(region.shape)
+            
+            progress = 40 + int(((i + 1) / len(images)) * 30)
+            self.progress_updated.emit(progress)
+        
+        # 直接以画布内存构造图片交给编码器（LA 以外的模式都不会再复制）
+        return Image.frombuffer(buffer_mode, size, canvas, 'raw', buffer_mode, 0, 1)
+
+
+# 多页 TIFF 每页使用的无损压缩方式
+CONTAINER_TIFF_COMPRESSION = 'tiff_adobe_deflate'
+
+# TIFF ImageDescription 标签，多页 TIFF 中用于保存每页的坐标表
+TIFF_DESCRIPTION_TAG = 270
+
+# TIFF ICC 配置文件标签
+TIFF_ICC_PROFILE_TAG = 34675
+
+
+def sheet_icc_profile(image):
+    """
+    读取拼接图当前页的 ICC 配置文件
+
+    多页 TIFF 切换页面后 info 中仍保留第一页的配置文件，因此 TIFF 直接读取当前页的标签。
+    """
+    if hasattr(image, 'tag_v2'):
+        return image.tag_v2.get(TIFF_ICC_PROFILE_TAG)
+    return image.info.get('icc_profile')
+
+
+def embedded_sheet_table(image):
+    """读取 TIFF 当前页 ImageDescription 中嵌入的坐标表，没有或不是坐标表时返回 None"""
+    description = getattr(image, 'tag_v2', {}).get(TIFF_DESCRIPTION_TAG)
+    if not description:
+        return None
+    try:
+        table = json.loads(description)
+    except ValueError:
+        # 扫描仪等程序写入的普通描述文字
+        return None
+    return table if isinstance(table, list) else None
+
+
+def iter_sheets(image, json_path):
+    """
+    依次返回拼接图中的每一页及其坐标表 (页码, 坐标表)
+
+    TIFF 优先逐页读取嵌入的坐标表，第一页没有嵌入坐标表时才使用同名 JSON 文件，
+    避免同目录下同名的 JPG 拼接图的 JSON 被套用到多页 TIFF 上。
+    """
+    if embedded_sheet_table(image) is None:
+        if not json_path:
+            raise ValueError("找不到坐标信息（没有JSON文件，图片中也没有嵌入坐标表）")
+        with open(json_path, 'r', encoding='utf-8') as f:
+            yield 0, json.load(f)
+        return
+    
+    for page in range(getattr(image, 'n_frames', 1)):
+        image.seek(page)
+        table = embedded_sheet_table(image)
+        if table is None:
+            raise ValueError(f"第 {page + 1} 页没有坐标信息")
+        yield page, table
+
+
+# 拆分结果可以打包成的格式
+ARCHIVE_FORMATS = ('zip', 'tar')
+
+# 写入压缩包时的缓冲区大小，减少网络共享上的小块写入
+ARCHIVE_BUFFER_SIZE = 4 * 1024 * 1024
+
+
+def archive_format_for(path):
+    """根据输出路径判断打包格式：'-'（标准输出）默认为 tar，普通目录返回 None"""
+    if path == '-':
+        return 'tar'
+    ext = Path(path).suffix.lower()
+    if ext == '.zip':
+        return 'zip'
+    if ext == '.tar':
+        return 'tar'
+    return None
+
+
+def unique_tile_name(filename, used_names):
+    """生成不重复的文件名（不区分大小写），重名时在文件名后加 _2、_3 ……"""
+    stem, ext = os.path.splitext(filename)
+    name = filename
+    counter = 2
+    while name.lower() in used_names:
+        name = f"{stem}_{counter}{ext}"
+        counter += 1
+    used_names.add(name.lower())
+    return name
+
+
+class DirectoryTileWriter:
+    """把拆分出的图片逐个保存到输出目录"""
+
+    def __init__(self, output_dir):
+        self.output_dir = output_dir
+        self.used_names = set()
+
+    def write(self, filename, image, image_format, save_options):
+        path = os.path.join(self.output_dir, unique_tile_name(filename, self.used_names))
+        image.save(path, image_format, **save_options)
+        return path
+
+    def close(self):
+        pass
+
+    def abort(self):
+        pass
+
+
+class _DiscardableStream:
+    """包装标准输出，放弃写入后丢弃之后的所有数据（不写出压缩包的结束标记）"""
+
+    def __init__(self, stream):
+        self.stream = stream
+
+    def write(self, data):
+        if self.stream is not None:
+            self.stream.write(data)
+        return len(data)
+
+    def flush(self):
+        if self.stream is not None:
+            self.stream.flush()
+
+    def discard(self):
+        self.flush()
+        self.stream = None
+
+
+class ArchiveTileWriter:
+    """
+    把拆分出的图片顺序写入一个 ZIP 或 TAR 包
+
+    target 为 '-' 时写入标准输出，便于通过管道传给其他程序。图片本身已经压缩，
+    所以 ZIP 使用不压缩的存储方式；底层文件使用大缓冲区，整体只做一次顺序写入。
+    """
+
+    def __init__(self, target, archive_format):
+        self.target = target
+        self.archive_format = archive_format
+        self.used_names = set()
+        if target == '-':
+            self.fileobj = _DiscardableStream(sys.stdout.buffer)
+            self.owns_fileobj = False
+        else:
+            self.fileobj = open(target, 'wb', buffering=ARCHIVE_BUFFER_SIZE)
+            self.owns_fileobj = True
+        if archive_format == 'zip':
+            self.archive = zipfile.ZipFile(self.fileobj, 'w', zipfile.ZIP_STORED)
+        else:
+            self.archive = tarfile.open(fileobj=self.fileobj, mode='w|', bufsize=ARCHIVE_BUFFER_SIZE)
+
+    def write(self, filename, image, image_format, save_options):
+        name = unique_tile_name(filename, self.used_names)
+        buffer = io.BytesIO()
+        image.save(buffer, image_format, **save_options)
+        data = buffer.getvalue()
+        
+        if self.archive_format == 'zip':
+            info = zipfile.ZipInfo(name, time.localtime()[:6])
+            info.compress_type = zipfile.ZIP_STORED
+            self.archive.writestr(info, data)
+        else:
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            info.mtime = int(time.time())
+            self.archive.addfile(info, io.BytesIO(data))
+        
+        return name if self.target == '-' else os.path.join(self.target, name)
+
+    def close(self):
+        self.archive.close()
+        if self.owns_fileobj:
+            self.fileobj.close()
+        else:
+            self.fileobj.flush()
+
+    def abort(self):
+        """
+        放弃写入：不能留下看起来完整的压缩包
+
+        写入文件时删除该文件；写入标准输出时已输出的数据无法收回，
+        只刷新已输出的部分，不写出结束标记，接收端会发现压缩包不完整。
+        """
+        if not self.owns_fileobj:
+            self.fileobj.discard()
+        try:
+            self.archive.close()
+        except Exception:
+            pass
+        if self.owns_fileobj:
+            self.fileobj.close()
+            try:
+                os.remove(self.target)
+            except OSError:
+                pass
 
 
 class SplitWorker(QThread):
@@ -238,15 +1328,28 @@ class SplitWorker(QThread):
     batch_progress = pyqtSignal(int, int, int)  # current_image, total_images, progress
     finished = pyqtSignal(bool, str, list)  # success, message, output_files
     
-    def __init__(self, image_list, output_dir):
+    def __init__(self, image_list, output_dir, restore_orientation=False, verify=False,
+                 archive_path=None, archive_format=None):
         super().__init__()
         self.image_list = image_list  # List of tuples: (image_path, json_path)
         self.output_dir = output_dir
+        self.restore_orientation = restore_orientation  # 是否撤销拼接时的方向变换
+        self.verify = verify  # 是否校验像素
+        self.archive_path = archive_path  # 写入的 ZIP/TAR 包路径，'-' 表示标准输出，None 表示逐个文件保存
+        self.archive_format = archive_format
     
     def run(self):
+        writer = None
         try:
+            load_image_codecs()
             output_files = []
             total_images = len(self.image_list)
+            verify_results = []  # (拼接图, 文件名, 状态)
+            
+            if self.archive_path:
+                writer = ArchiveTileWriter(self.archive_path, self.archive_format)
+            else:
+                writer = DirectoryTileWriter(self.output_dir)
             
             for idx, (image_path, json_path) in enumerate(self.image_list):
                 self.batch_progress.emit(idx + 1, total_images, 10)
@@ -255,51 +1358,140 @@ class SplitWorker(QThread):
                 image = Image.open(image_path)
                 self.batch_progress.emit(idx + 1, total_images, 30)
                 
-                # 读取 JSON 元数据
-                with open(json_path, 'r', encoding='utf-8') as f:
-                    metadata = json.load(f)
-                
-                self.batch_progress.emit(idx + 1, total_images, 50)
-                
-                # 切割并保存每张图片
-                for i, item in enumerate(metadata):
-                    x = item['x']
-                    y = item['y']
-                    w = item['width']
-                    h = item['height']
-                    filename = item['filename']
-                    dpi = tuple(item.get('dpi', [300, 300]))  # 获取DPI信息，默认300
-                    # was_rotated = item.get('was_rotated', False)  # 是否被旋转过（不再使用）
+                # 逐页读取坐标表：普通拼接图读取同名 JSON，多页 TIFF 读取每页嵌入的坐标表
+                for page, metadata in iter_sheets(image, json_path):
+                    sheet_name = os.path.basename(image_path)
+                    if page:
+                        sheet_name += f" 第 {page + 1} 页"
+                    sheet_profile = sheet_icc_profile(image)
                     
-                    # 切割图片
-                    cropped = image.crop((x, y, x + w, y + h))
+                    # 校验每张图的像素
+                    if self.verify:
+                        statuses = verify_tiles(image, metadata)
+                        verify_results.extend((sheet_name, item['filename'], status)
+                                              for item, status in zip(metadata, statuses))
                     
-                    # 保持纵向，不再恢复原始方向
-                    # 所有图片拆分后都是纵向格式
+                    self.batch_progress.emit(idx + 1, total_images, 50)
                     
-                    # 保存为原始文件名，保持DPI
-                    output_path = os.path.join(self.output_dir, filename)
-                    
-                    # 根据原始文件扩展名保存
-                    ext = Path(filename).suffix.lower()
-                    if ext in ['.jpg', '.jpeg']:
-                        cropped.save(output_path, 'JPEG', quality=100, subsampling=0, dpi=dpi)
-                    elif ext == '.png':
-                        cropped.save(output_path, 'PNG', dpi=dpi)
-                    else:
-                        cropped.save(output_path, 'PNG', dpi=dpi)
-                    
-                    output_files.append(output_path)
+                    # 切割并保存每张图片
+                    for i, item in enumerate(metadata):
+                        x = item['x']
+                        y = item['y']
+                        w = item['width']
+                        h = item['height']
+                        filename = item['filename']
+                        dpi = tuple(item.get('dpi', [300, 300]))  # 获取DPI信息，默认300
+                        
+                        # 切割图片
+                        cropped = image.crop((x, y, x + w, y + h))
+                        
+                        # 默认保持纵向，所有图片拆分后都是纵向格式
+                        save_options = {}
+                        if self.restore_orientation:
+                            transform = item.get('transform')
+                            # 旧版JSON没有 transform 字段，只记录了是否旋转
+                            if transform is None and 'orientation' not in item and item.get('was_rotated'):
+                                transform = 'ROTATE_90'
+                            if transform:
+                                # 撤销拼接时的变换，恢复原文件的像素排列，并写回EXIF方向
+                                cropped = cropped.transpose(Image.Transpose[invert_transform(transform)])
+                                orientation = item.get('orientation', 1)
+                                if orientation != 1:
+                                    exif = Image.Exif()
+                                    exif[EXIF_ORIENTATION_TAG] = orientation
+                                    save_options['exif'] = exif.tobytes()
+                        
+                        # 还原原始图片的模式和 ICC 配置文件
+                        cropped = restore_source_mode(cropped, item)
+                        if 'icc_profile' in item:
+                            save_options['icc_profile'] = decode_icc_profile(item['icc_profile'])
+                        else:
+                            # 显式指定（可能为空），不沿用裁剪时从拼接图复制来的配置文件
+                            save_options['icc_profile'] = sheet_profile
+                        
+                        # 根据原始文件扩展名保存，保持DPI
+                        save_options['dpi'] = dpi
+                        ext = Path(filename).suffix.lower()
+                        if ext in ['.jpg', '.jpeg'] and cropped.mode in JPEG_MODES:
+                            image_format = 'JPEG'
+                            save_options.update(quality=100, subsampling=0)
+                        elif ext in ['.tif', '.tiff'] or cropped.mode not in PNG_MODES:
+                            image_format = 'TIFF'
+                        else:
+                            image_format = 'PNG'
+                        
+                        # 保存为原始文件名，不同拼接图中的同名文件自动加序号
+                        output_files.append(writer.write(filename, cropped, image_format, save_options))
+                        
+                        progress = 50 + int(((i + 1) / len(metadata)) * 40)
+                        self.batch_progress.emit(idx + 1, total_images, progress)
                     
-                    progress = 50 + int(((i + 1) / len(metadata)) * 40)
-                    self.batch_progress.emit(idx + 1, total_images, progress)
-                
                 self.batch_progress.emit(idx + 1, total_images, 100)
             
-            self.finished.emit(True, f"拆分成功！共处理 {total_images} 个拼接图，生成了 {len(output_files)} 个图片文件", output_files)
+            writer.close()
+            writer = None
+            
+            message = f"拆分成功！共处理 {total_images} 个拼接图，生成了 {len(output_files)} 个图片文件"
+            if self.archive_path and self.archive_path != '-':
+                message += f"，已写入 {self.archive_path}"
+            if self.verify:
+                message += self.format_verify_results(verify_results)
+            self.finished.emit(True, message, output_files)
             
         except Exception as e:
+            if writer is not None:
+                # 放弃未完成的压缩包，避免留下缺少图片但看起来完整的文件
+                try:
+                    writer.abort()
+                except Exception:
+                    pass
             self.finished.emit(False, f"拆分失败：{str(e)}", [])
+    
+    def format_verify_results(self, verify_results):
+        """生成像素校验结果的说明文字"""
+        passed = sum(1 for _, _, status in verify_results if status == 'ok')
+        mismatched = [(sheet, name) for sheet, name, status in verify_results if status == 'mismatch']
+        missing = sum(1 for _, _, status in verify_results if status == 'missing')
+        
+        text = f"\n像素校验：{passed} 张一致"
+        if missing:
+            text += f"，{missing} 张缺少校验值（拼接时未记录）"
+        if mismatched:
+            text += f"，{len(mismatched)} 张不一致：\n"
+            text += "\n".join(f"  - {sheet} / {name}" for sheet, name in mismatched[:10])
+            if len(mismatched) > 10:
+                text += f"\n  ... 还有 {len(mismatched) - 10} 张"
+        return text
+
+
+class ScanWorker(QThread):
+    """递归扫描文件夹、校验图片文件的工作线程"""
+    files_found = pyqtSignal(list)  # 扫描过程中分块回传的图片路径
+    finished = pyqtSignal(bool, str, list)  # success, message, ordered_files
+
+    def __init__(self, paths):
+        super().__init__()
+        self.paths = paths
+        self.stop_requested = False
+
+    def stop(self):
+        """请求停止扫描"""
+        self.stop_requested = True
+
+    def run(self):
+        try:
+            load_image_codecs()
+            files = scan_image_files(
+                self.paths,
+                on_found=self.files_found.emit,
+                should_stop=lambda: self.stop_requested
+            )
+            if self.stop_requested:
+                self.finished.emit(False, "扫描已取消", [])
+            else:
+                self.finished.emit(True, f"扫描完成，找到 {len(files)} 张图片", files)
+        except Exception as e:
+            self.finished.emit(False, f"扫描失败：{str(e)}", [])
 
 
 class DropZone(QFrame):
@@ -348,6 +1540,10 @@ class ImageStitcherApp(QMainWindow):
     def __init__(self):
         super().__init__()
         self.stitch_images = []
+        self.stitch_image_set = set()  # 用于快速去重
+        self.scan_worker = None
+        self.pending_scan_paths = []
+        self.scan_start_index = 0
         self.stitch_worker = None
         self.split_worker = None
         
@@ -355,6 +1551,12 @@ class ImageStitcherApp(QMainWindow):
         self.settings = QSettings("ImageStitcher", "ImageStitcherApp")
         self.last_save_dir = self.settings.value("last_save_dir", os.path.expanduser("~"))
         self.last_split_output_dir = self.settings.value("last_split_output_dir", "")
+        self.restore_orientation = self.settings.value("restore_orientation", False, type=bool)
+        self.verify_split = self.settings.value("verify_split", False, type=bool)
+        self.split_output_mode = self.settings.value("split_output_mode", "")
+        self.skip_duplicates = self.settings.value("skip_duplicates", False, type=bool)
+        self.proof_scale = self.settings.value("proof_scale", 1, type=int)
+        self.stitch_container = self.settings.value("stitch_container", "")
         
         self.init_ui()
         self.apply_dark_theme()
@@ -387,7 +1589,7 @@ class ImageStitcherApp(QMainWindow):
         layout = QVBoxLayout(widget)
         
         # 拖放区域
-        self.stitch_drop_zone = DropZone("拖放图片到这里（每批最多6张）")
+        self.stitch_drop_zone = DropZone("拖放图片或文件夹到这里（每批最多6张）")
         self.stitch_drop_zone.files_dropped.connect(self.on_stitch_files_dropped)
         layout.addWidget(self.stitch_drop_zone)
         
@@ -402,6 +1604,29 @@ class ImageStitcherApp(QMainWindow):
         self.stitch_filenames_label.setWordWrap(True)
         layout.addWidget(self.stitch_filenames_label)
         
+        # 跳过重复图片选项
+        self.skip_duplicates_checkbox = QCheckBox("拼接前跳过重复图片（包括近似重复）")
+        self.skip_duplicates_checkbox.setChecked(self.skip_duplicates)
+        self.skip_duplicates_checkbox.setStyleSheet("color: #888888; font-size: 12px;")
+        layout.addWidget(self.skip_duplicates_checkbox)
+        
+        # 输出分辨率：原始分辨率或快速校样
+        self.proof_scale_combo = QComboBox()
+        self.proof_scale_combo.addItem("原始分辨率（最终输出）", 1)
+        for scale in PROOF_SCALES:
+            self.proof_scale_combo.addItem(f"快速校样（1/{scale} 分辨率）", scale)
+        index = self.proof_scale_combo.findData(self.proof_scale)
+        self.proof_scale_combo.setCurrentIndex(max(0, index))
+        layout.addWidget(self.proof_scale_combo)
+        
+        # 输出方式：每批单独保存，或全部批次写入一个多页 TIFF
+        self.stitch_container_combo = QComboBox()
+        self.stitch_container_combo.addItem("每批保存为单独的图片和 JSON 文件", "")
+        self.stitch_container_combo.addItem("所有批次保存为一个多页 TIFF", "tiff")
+        index = self.stitch_container_combo.findData(self.stitch_container)
+        self.stitch_container_combo.setCurrentIndex(max(0, index))
+        layout.addWidget(self.stitch_container_combo)
+        
         # 拼接按钮
         stitch_btn = QPushButton("开始拼接")
         stitch_btn.setStyleSheet("""
@@ -476,7 +1701,7 @@ class ImageStitcherApp(QMainWindow):
         layout = QVBoxLayout(widget)
         
         # 大图拖放区域
-        self.image_drop_zone = DropZone("拖放拼接后的图片（JPG），支持多选")
+        self.image_drop_zone = DropZone("拖放拼接后的图片（JPG/PNG/多页 TIFF），支持多选")
         self.image_drop_zone.files_dropped.connect(self.on_image_dropped)
         layout.addWidget(self.image_drop_zone)
         
@@ -496,10 +1721,22 @@ class ImageStitcherApp(QMainWindow):
         layout.addWidget(self.json_match_label)
         
         # 说明标签
-        hint_label = QLabel("提示：拖放多个JPG图片，会自动查找同目录下的JSON文件")
+        hint_label = QLabel("提示：拖放多个拼接图，会自动查找同目录下的JSON文件")
         hint_label.setStyleSheet("color: #666666; font-size: 11px;")
         layout.addWidget(hint_label)
         
+        # 恢复原始方向选项
+        self.restore_orientation_checkbox = QCheckBox("恢复原始方向（撤销拼接时的旋转，并写回EXIF方向）")
+        self.restore_orientation_checkbox.setChecked(self.restore_orientation)
+        self.restore_orientation_checkbox.setStyleSheet("color: #888888; font-size: 12px;")
+        layout.addWidget(self.restore_orientation_checkbox)
+        
+        # 像素校验选项
+        self.verify_split_checkbox = QCheckBox("校验像素（与拼接时记录的校验值比对）")
+        self.verify_split_checkbox.setChecked(self.verify_split)
+        self.verify_split_checkbox.setStyleSheet("color: #888888; font-size: 12px;")
+        layout.addWidget(self.verify_split_checkbox)
+        
         # 拆分按钮
         split_btn = QPushButton("开始拆分")
         split_btn.setStyleSheet("""
@@ -539,6 +1776,15 @@ class ImageStitcherApp(QMainWindow):
         output_dir_btn.clicked.connect(self.select_output_dir)
         layout.addWidget(output_dir_btn)
         
+        # 输出方式：逐个文件或打包为一个文件
+        self.split_output_mode_combo = QComboBox()
+        self.split_output_mode_combo.addItem("逐个保存到输出目录", "")
+        self.split_output_mode_combo.addItem("打包为一个 ZIP 文件", "zip")
+        self.split_output_mode_combo.addItem("打包为一个 TAR 文件", "tar")
+        index = self.split_output_mode_combo.findData(self.split_output_mode)
+        self.split_output_mode_combo.setCurrentIndex(max(0, index))
+        layout.addWidget(self.split_output_mode_combo)
+        
         self.split_output_label = QLabel("输出目录：原图片所在目录")
         self.split_output_label.setStyleSheet("color: #888888;")
         layout.addWidget(self.split_output_label)
@@ -606,30 +1852,79 @@ class ImageStitcherApp(QMainWindow):
         """)
     
     def on_stitch_files_dropped(self, files):
-        """处理拖放的图片文件"""
-        valid_extensions = {'.jpg', '.jpeg', '.png', '.bmp', '.webp', '.heic', '.heif'}
+        """处理拖放的图片文件或文件夹（文件夹会被递归扫描）"""
+        self.pending_scan_paths.extend(files)
+        if not self.is_scanning():
+            self.start_scan()
+
+    def add_stitch_paths(self, paths):
+        """添加图片或文件夹路径（用于命令行参数）"""
+        if paths:
+            self.on_stitch_files_dropped(list(paths))
+
+    def is_scanning(self):
+        """是否正在扫描文件"""
+        return self.scan_worker is not None and self.scan_worker.isRunning()
+
+    def start_scan(self):
+        """扫描等待中的路径"""
+        paths = self.pending_scan_paths
+        self.pending_scan_paths = []
+        if not paths:
+            return
+
+        self.scan_start_index = len(self.stitch_images)
+        self.stitch_status.setText("正在扫描文件...")
+        self.scan_worker = ScanWorker(paths)
+        self.scan_worker.files_found.connect(self.on_scan_files_found)
+        self.scan_worker.finished.connect(self.on_scan_finished)
+        self.scan_worker.start()
+        self.update_stitch_ui()
+
+    def on_scan_files_found(self, files):
+        """扫描过程中实时加入找到的图片"""
+        if self.scan_worker is None or self.scan_worker.stop_requested:
+            return
         for file in files:
-            ext = Path(file).suffix.lower()
-            if ext in valid_extensions and file not in self.stitch_images:
+            if file not in self.stitch_image_set:
+                self.stitch_image_set.add(file)
                 self.stitch_images.append(file)
-        
         self.update_stitch_ui()
-    
+
+    def on_scan_finished(self, success, message, ordered_files):
+        """扫描完成，按确定的顺序重新排列本次加入的图片"""
+        if success:
+            added = self.stitch_images[self.scan_start_index:]
+            added_set = set(added)
+            reordered = [f for f in ordered_files if f in added_set]
+            if len(reordered) == len(added):
+                self.stitch_images[self.scan_start_index:] = reordered
+            self.stitch_status.setText(message)
+
+        if self.pending_scan_paths:
+            self.start_scan()
+        else:
+            self.update_stitch_ui()
+
     def update_stitch_ui(self):
         """更新拼接界面"""
         count = len(self.stitch_images)
         self.stitch_files_label.setText(f"已选择：{count} 张图片")
         
-        # 显示文件名列表
+        # 显示文件名列表（文件很多时只显示前面一部分，避免界面卡顿）
         if count > 0:
-            filenames = [os.path.basename(f) for f in self.stitch_images]
-            self.stitch_filenames_label.setText(f"文件列表：\n" + "\n".join(f"{i+1}. {fn}" for i, fn in enumerate(filenames)))
+            filenames = [os.path.basename(f) for f in self.stitch_images[:MAX_LISTED_FILENAMES]]
+            text = "文件列表：\n" + "\n".join(f"{i+1}. {fn}" for i, fn in enumerate(filenames))
+            if count > MAX_LISTED_FILENAMES:
+                text += f"\n... 还有 {count - MAX_LISTED_FILENAMES} 张图片"
+            self.stitch_filenames_label.setText(text)
         else:
             self.stitch_filenames_label.setText("")
         
         # 移除6张的限制，允许任意数量
         if count >= 2:
-            self.stitch_btn.setEnabled(True)
+            # 扫描过程中不允许开始拼接
+            self.stitch_btn.setEnabled(not self.is_scanning())
             self.stitch_files_label.setStyleSheet("color: #4caf50;")
             # 提示将分批处理
             if count > 6:
@@ -644,19 +1939,29 @@ class ImageStitcherApp(QMainWindow):
     
     def clear_stitch_files(self):
         """清除已选图片"""
+        self.pending_scan_paths = []
+        if self.is_scanning():
+            self.scan_worker.stop()
         self.stitch_images.clear()
+        self.stitch_image_set.clear()
         self.stitch_progress.setValue(0)
         self.stitch_status.setText("")
         self.update_stitch_ui()
     
     def start_stitch(self):
         """开始拼接"""
+        container = self.stitch_container_combo.currentData()
+        if container == 'tiff':
+            default_name, file_filter = "combined.tif", "多页 TIFF 图片 (*.tif *.tiff)"
+        else:
+            default_name, file_filter = "combined.jpg", "JPEG 图片 (*.jpg)"
+        
         # 选择输出路径（使用上次保存的目录）
         file_path, _ = QFileDialog.getSaveFileName(
             self,
             "保存拼接图片",
-            os.path.join(self.last_save_dir, "combined.jpg"),
-            "JPEG 图片 (*.jpg)"
+            os.path.join(self.last_save_dir, default_name),
+            file_filter
         )
         
         if file_path:
@@ -667,7 +1972,22 @@ class ImageStitcherApp(QMainWindow):
             self.stitch_btn.setEnabled(False)
             self.stitch_status.setText("正在处理...")
             
-            self.stitch_worker = StitchWorker(self.stitch_images, file_path)
+            # 保存去重选项
+            self.skip_duplicates = self.skip_duplicates_checkbox.isChecked()
+            self.settings.setValue("skip_duplicates", self.skip_duplicates)
+            
+            # 保存输出分辨率选项
+            self.proof_scale = self.proof_scale_combo.currentData()
+            self.settings.setValue("proof_scale", self.proof_scale)
+            
+            # 保存输出方式选项
+            self.stitch_container = container
+            self.settings.setValue("stitch_container", self.stitch_container)
+            
+            self.stitch_worker = StitchWorker(list(self.stitch_images), file_path,
+                                              skip_duplicates=self.skip_duplicates,
+                                              proof_scale=self.proof_scale,
+                                              container=container or None)
             self.stitch_worker.batch_progress.connect(self.on_batch_progress)
             self.stitch_worker.finished.connect(self.on_stitch_finished)
             self.stitch_worker.start()
@@ -712,10 +2032,14 @@ class ImageStitcherApp(QMainWindow):
         total_count = 0
         
         for file in files:
-            if file.lower().endswith(('.jpg', '.jpeg')):
+            if file.lower().endswith(('.jpg', '.jpeg', '.png', '.tif', '.tiff')):
                 # 查找对应的JSON文件
                 json_path = self.find_matching_json(file)
-                if json_path and os.path.exists(json_path):
+                if file.lower().endswith(('.tif', '.tiff')):
+                    # 多页 TIFF 优先使用每页嵌入的坐标表，同名JSON只在没有嵌入坐标表时使用
+                    self.split_image_list.append((file, json_path))
+                    matched_count += 1
+                elif json_path and os.path.exists(json_path):
                     self.split_image_list.append((file, json_path))
                     matched_count += 1
                 total_count += 1
@@ -744,9 +2068,13 @@ class ImageStitcherApp(QMainWindow):
             self.split_filenames_label.setText(f"图片列表：\n" + "\n".join(f"{i+1}. {fn}" for i, fn in enumerate(filenames)))
             
             # 显示匹配状态
-            total = len([f for f in self.split_image_list if f[1]])
-            matched = len(self.split_image_list)
-            self.json_match_label.setText(f"✓ 已匹配 {matched}/{total} 个JSON文件")
+            total = len(self.split_image_list)
+            matched = len([f for f in self.split_image_list if f[1]])
+            embedded = total - matched
+            text = f"✓ 已匹配 {matched}/{total} 个JSON文件"
+            if embedded:
+                text += f"，{embedded} 个多页 TIFF 使用内嵌坐标"
+            self.json_match_label.setText(text)
             self.json_match_label.setStyleSheet("color: #4caf50; font-size: 12px;")
             
             self.split_btn.setEnabled(True)
@@ -775,10 +2103,37 @@ class ImageStitcherApp(QMainWindow):
         self.last_split_output_dir = self.split_output_dir
         self.settings.setValue("last_split_output_dir", self.last_split_output_dir)
         
+        # 打包输出时选择压缩包的保存位置
+        self.split_output_mode = self.split_output_mode_combo.currentData()
+        self.settings.setValue("split_output_mode", self.split_output_mode)
+        archive_path = None
+        if self.split_output_mode:
+            archive_path, _ = QFileDialog.getSaveFileName(
+                self,
+                "保存拆分结果",
+                os.path.join(self.split_output_dir, f"split_tiles.{self.split_output_mode}"),
+                f"{self.split_output_mode.upper()} 文件 (*.{self.split_output_mode})"
+            )
+            if not archive_path:
+                return
+            self.split_output_dir = os.path.dirname(archive_path)
+        
         self.split_btn.setEnabled(False)
         self.split_status.setText("正在处理...")
         
-        self.split_worker = SplitWorker(self.split_image_list, self.split_output_dir)
+        # 保存方向选项
+        self.restore_orientation = self.restore_orientation_checkbox.isChecked()
+        self.settings.setValue("restore_orientation", self.restore_orientation)
+        
+        # 保存校验选项
+        self.verify_split = self.verify_split_checkbox.isChecked()
+        self.settings.setValue("verify_split", self.verify_split)
+        
+        self.split_worker = SplitWorker(self.split_image_list, self.split_output_dir,
+                                        restore_orientation=self.restore_orientation,
+                                        verify=self.verify_split,
+                                        archive_path=archive_path,
+                                        archive_format=self.split_output_mode or None)
         self.split_worker.batch_progress.connect(self.on_split_batch_progress)
         self.split_worker.finished.connect(self.on_split_finished)
         self.split_worker.start()
@@ -817,7 +2172,56 @@ class ImageStitcherApp(QMainWindow):
             QMessageBox.warning(self, "错误", message)
 
 
+def split_cli(argv):
+    """
+    命令行拆分，不显示窗口
+
+    python main.py split 拼接图... -o 输出目录 | 输出.zip | 输出.tar | -（以 TAR 写入标准输出）
+    """
+    parser = argparse.ArgumentParser(prog='main.py split', description="按JSON坐标拆分拼接图")
+    parser.add_argument('images', nargs='+',
+                        help="拼接图路径，同目录下需要有同名的JSON文件（多页 TIFF 可省略）")
+    parser.add_argument('-o', '--output', required=True,
+                        help="输出目录、.zip/.tar 文件，或 - 表示写入标准输出")
+    parser.add_argument('--format', choices=ARCHIVE_FORMATS, help="打包格式（默认根据输出路径判断）")
+    parser.add_argument('--restore-orientation', action='store_true', help="恢复原始方向")
+    parser.add_argument('--verify', action='store_true', help="校验像素")
+    args = parser.parse_args(argv)
+    
+    image_list = []
+    for image_path in args.images:
+        json_path = Path(image_path).with_suffix('.json')
+        if Path(image_path).suffix.lower() in ('.tif', '.tiff'):
+            # 多页 TIFF 优先读取每页内嵌的坐标表，同名JSON只在没有嵌入坐标表时使用
+            image_list.append((image_path, str(json_path) if json_path.exists() else None))
+        elif json_path.exists():
+            image_list.append((image_path, str(json_path)))
+        else:
+            print(f"找不到JSON文件：{json_path}", file=sys.stderr)
+            return 1
+    
+    archive_format = args.format or archive_format_for(args.output)
+    if archive_format:
+        worker = SplitWorker(image_list, os.path.dirname(os.path.abspath(args.output)),
+                             restore_orientation=args.restore_orientation, verify=args.verify,
+                             archive_path=args.output, archive_format=archive_format)
+    else:
+        os.makedirs(args.output, exist_ok=True)
+        worker = SplitWorker(image_list, args.output,
+                             restore_orientation=args.restore_orientation, verify=args.verify)
+    
+    results = []
+    worker.finished.connect(lambda success, message, _: results.append((success, message)))
+    worker.run()
+    success, message = results[0]
+    print(message, file=sys.stderr)
+    return 0 if success else 1
+
+
 def main():
+    if len(sys.argv) > 1 and sys.argv[1] == 'split':
+        sys.exit(split_cli(sys.argv[2:]))
+    
     app = QApplication(sys.argv)
     app.setStyle('Fusion')
     
@@ -831,6 +2235,12 @@ def main():
     window = ImageStitcherApp()
     window.show()
     
+    # 窗口显示后在后台线程中加载图像处理模块
+    QTimer.singleShot(0, lambda: threading.Thread(target=load_image_codecs, daemon=True).start())
+    
+    # 命令行传入的图片或文件夹路径直接加入拼接列表
+    window.add_stitch_paths(app.arguments()[1:])
+    
     sys.exit(app.exec())
 
 
@@ -0,0 +1,58 @@
+"""拼接和拆分测试脚本共用的辅助函数：生成测试图片、同步运行工作线程"""
+import os
+
+import numpy as np
+
+import main
+
+main.load_image_codecs()
+from main import Image
+
+rng = np.random.default_rng(0)
+
+
+def random_image(mode, size):
+    width, height = size
+    if mode == 'I;16':
+        return Image.fromarray(rng.integers(0, 65536, (height, width), dtype=np.uint16))
+    channels = main.CANVAS_CHANNELS[mode]
+    shape = (height, width) if channels == 1 else (height, width, channels)
+    return Image.fromarray(rng.integers(0, 256, shape, dtype=np.uint8), mode)
+
+
+def make_inputs(directory, mode):
+    """竖向、横向（拼接时旋转）和带 EXIF 方向（摆正后为竖向）的图片各一张"""
+    ext = '.tif' if mode == 'CMYK' else '.png'
+    paths = []
+    for name, size, orientation in (('portrait', (30, 50), 1), ('landscape', (50, 30), 1),
+                                    ('exif', (60, 40), 6)):
+        path = os.path.join(directory, f"{name}_{mode.replace(';', '')}{ext}")
+        options = {}
+        if orientation != 1 and ext == '.png':
+            exif = Image.Exif()
+            exif[main.EXIF_ORIENTATION_TAG] = orientation
+            options['exif'] = exif.tobytes()
+        random_image(mode, size).save(path, **options)
+        paths.append(path)
+    return paths
+
+
+def run_worker(worker):
+    results = []
+    worker.finished.connect(lambda success, message, files: results.append((success, message, files)))
+    worker.run()
+    success, message, files = results[0]
+    assert success, message
+    return message, files
+
+
+def stitch(paths, output_path, **options):
+    return run_worker(main.StitchWorker(paths, output_path, **options))
+
+
+def split(image_list, output_dir, **options):
+    return run_worker(main.SplitWorker(image_list, output_dir, restore_orientation=True, verify=True, **options))
+
+
+def same_pixels(a, b):
+    return a.mode == b.mode and np.array_equal(np.asarray(a), np.asarray(b))
@@ -0,0 +1,84 @@
+"""测试打包输出：重名文件加序号、ZIP/TAR/标准输出，拆分失败时不留下看起来完整的压缩包"""
+import io
+import json
+import os
+import subprocess
+import sys
+import tarfile
+import tempfile
+import zipfile
+
+import main
+from roundtrip_helpers import make_inputs, split, stitch
+
+MAIN_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "main.py")
+
+
+def test_unique_tile_name():
+    used = set()
+    names = [main.unique_tile_name(name, used) for name in ('a.png', 'A.png', 'a.png', 'a_2.png', 'b.png')]
+    assert names == ['a.png', 'A_2.png', 'a_3.png', 'a_2_2.png', 'b.png'], names
+
+
+def test_archive_output_and_cleanup():
+    with tempfile.TemporaryDirectory() as d:
+        paths = make_inputs(d, 'RGB')
+        # 两张拼接图包含同名文件，打包时自动加序号
+        sheets = [stitch(paths, os.path.join(d, f"sheet{i}.jpg"))[1] for i in range(2)]
+        image_list = [(files[0], files[1]) for files in sheets]
+        for archive_format in main.ARCHIVE_FORMATS:
+            if archive_format not in ('zip', 'tar'):
+                continue
+            archive = os.path.join(d, f"tiles.{archive_format}")
+            split(image_list, d, archive_path=archive, archive_format=archive_format)
+            if archive_format == 'zip':
+                names = zipfile.ZipFile(archive).namelist()
+            else:
+                with tarfile.open(archive) as tar:
+                    names = tar.getnames()
+            assert len(names) == 2 * len(paths) and len(set(names)) == len(names), names
+
+        # 拆分失败时不留下看起来完整的压缩包
+        archive = os.path.join(d, "broken.zip")
+        results = []
+        worker = main.SplitWorker([(sheets[0][0], os.path.join(d, "missing.json"))], d,
+                                  archive_path=archive, archive_format='zip')
+        worker.finished.connect(lambda success, message, files: results.append(success))
+        worker.run()
+        assert results == [False] and not os.path.exists(archive)
+
+
+def test_stdout_stream():
+    with tempfile.TemporaryDirectory() as d:
+        paths = make_inputs(d, 'RGB')
+        _, files = stitch(paths, os.path.join(d, "combined.jpg"))
+        result = subprocess.run([sys.executable, MAIN_SCRIPT, 'split', files[0], '-o', '-'],
+                                capture_output=True, check=True)
+        with tarfile.open(fileobj=io.BytesIO(result.stdout), mode='r|') as tar:
+            names = [member.name for member in tar]
+        assert names == [os.path.basename(p) for p in paths], names
+
+        # 拆分失败时不写出结束标记，接收端能发现压缩包不完整
+        with open(files[1], 'r', encoding='utf-8') as f:
+            table = json.load(f)
+        del table[-1]['x']
+        with open(files[1], 'w', encoding='utf-8') as f:
+            json.dump(table, f)
+        result = subprocess.run([sys.executable, MAIN_SCRIPT, 'split', files[0], '-o', '-'],
+                                capture_output=True)
+        assert result.returncode != 0
+        try:
+            with tarfile.open(fileobj=io.BytesIO(result.stdout), mode='r|') as tar:
+                for member in tar:
+                    pass
+        except tarfile.TarError:
+            pass
+        else:
+            raise AssertionError("失败时输出的 TAR 流看起来是完整的")
+
+
+if __name__ == '__main__':
+    for name, func in list(globals().items()):
+        if name.startswith('test_'):
+            func()
+            print(f"✓ {name}")
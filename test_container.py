@@ -0,0 +1,57 @@
+"""测试多页 TIFF 输出：内嵌坐标表优先于同名 JSON、逐页的 ICC 配置文件、失败时不留下残缺文件"""
+import os
+import tempfile
+
+import main
+from roundtrip_helpers import Image, make_inputs, random_image, split, stitch
+
+
+def test_tiff_prefers_embedded_tables_over_sidecar():
+    with tempfile.TemporaryDirectory() as d:
+        paths = make_inputs(d, 'RGB') + make_inputs(d, 'L') + make_inputs(d, 'RGBA')
+        stitch(paths[:2], os.path.join(d, "combined.jpg"))
+        _, files = stitch(paths, os.path.join(d, "combined.jpg"), container='tiff')
+        out = os.path.join(d, "out")
+        os.makedirs(out)
+        _, tiles = split([(files[0], os.path.join(d, "combined.json"))], out)
+        assert len(tiles) == len(paths), tiles
+
+
+def test_icc_profile_is_read_per_page():
+    from PIL import ImageCms
+    srgb = ImageCms.ImageCmsProfile(ImageCms.createProfile('sRGB')).tobytes()
+    with tempfile.TemporaryDirectory() as d:
+        paths = []
+        for i in range(8):
+            paths.append(os.path.join(d, f"{i}.png"))
+            # 前6张（第1页）带 sRGB 配置文件，后2张（第2页）没有
+            random_image('RGB', (30, 50)).save(paths[-1], icc_profile=srgb if i < 6 else None)
+        _, files = stitch(paths, os.path.join(d, "combined.jpg"), container='tiff')
+        out = os.path.join(d, "out")
+        os.makedirs(out)
+        split([(files[0], None)], out)
+        for i, path in enumerate(paths):
+            profile = Image.open(os.path.join(out, os.path.basename(path))).info.get('icc_profile')
+            assert profile == (srgb if i < 6 else None), path
+
+
+
+def test_failed_batch_removes_partial_tiff():
+    with tempfile.TemporaryDirectory() as d:
+        paths = make_inputs(d, 'RGB') + make_inputs(d, 'L') + make_inputs(d, 'RGBA')
+        # 第2批中的图片损坏，第1页已经写入
+        with open(paths[-1], 'wb') as f:
+            f.write(b'\x89PNG\r\n\x1a\n broken')
+        results = []
+        worker = main.StitchWorker(paths, os.path.join(d, "combined.jpg"), container='tiff')
+        worker.finished.connect(lambda success, message, files: results.append(success))
+        worker.run()
+        assert results == [False]
+        assert not os.path.exists(os.path.join(d, "combined.tif"))
+
+
+if __name__ == '__main__':
+    for name, func in list(globals().items()):
+        if name.startswith('test_'):
+            func()
+            print(f"✓ {name}")
@@ -0,0 +1,85 @@
+"""测试重复图片识别：感知哈希、分段查找和哈希索引缓存"""
+import os
+import tempfile
+
+import numpy as np
+
+import main
+
+main.load_image_codecs()
+from main import Image
+
+
+def save(directory, name, image, **options):
+    path = os.path.join(directory, name)
+    image.save(path, **options)
+    return path
+
+
+def test_distinct_16bit_images_not_flagged():
+    # 亮的16位图片转换为8位时如果被截断，会全部变成同一个哈希
+    rng = np.random.default_rng(1)
+    with tempfile.TemporaryDirectory() as d:
+        paths = [save(d, f"scan{i}.png", Image.fromarray(rng.integers(40000, 65536, (120, 90), dtype=np.uint16)))
+                 for i in range(4)]
+        hashes = {main.perceptual_hash(p) for p in paths}
+        assert len(hashes) == 4, hashes
+        assert main.find_duplicates(paths) == []
+
+
+def test_orientation_tag_copies_are_near_duplicates():
+    rng = np.random.default_rng(2)
+    blocks = rng.integers(0, 256, (8, 12, 3), dtype=np.uint8)
+    photo = Image.fromarray(np.kron(blocks, np.ones((10, 10, 1), dtype=np.uint8)))
+    with tempfile.TemporaryDirectory() as d:
+        paths = [save(d, "o1.jpg", photo, quality=95)]
+        for orientation in range(2, 9):
+            # 按 EXIF 方向的逆变换保存像素，摆正后与原图相同
+            transform = main.EXIF_ORIENTATION_TRANSFORMS[orientation]
+            stored = photo.transpose(Image.Transpose[main.invert_transform(transform)])
+            exif = Image.Exif()
+            exif[main.EXIF_ORIENTATION_TAG] = orientation
+            paths.append(save(d, f"o{orientation}.jpg", stored, quality=95, exif=exif.tobytes()))
+        duplicates = main.find_duplicates(paths)
+        assert [(dup, kept, kind) for dup, kept, kind in duplicates] == \
+            [(p, paths[0], 'near') for p in paths[1:]], duplicates
+
+
+def test_exact_duplicates_and_banding():
+    rng = np.random.default_rng(3)
+    with tempfile.TemporaryDirectory() as d:
+        a = save(d, "a.png", Image.fromarray(rng.integers(0, 256, (64, 64, 3), dtype=np.uint8)))
+        b = save(d, "b.png", Image.fromarray(rng.integers(0, 256, (64, 64, 3), dtype=np.uint8)))
+        with open(a, 'rb') as src, open(os.path.join(d, "a_copy.png"), 'wb') as dst:
+            dst.write(src.read())
+        copy = os.path.join(d, "a_copy.png")
+        assert main.find_duplicates([a, b, copy]) == [(copy, a, 'exact')]
+
+    # 距离不超过4时至少有一段完全相同，分段查找不会漏掉
+    for shift in range(0, 64 - 4):
+        flipped = 0x0123456789abcdef ^ (0b1111 << shift)
+        keys = [((v >> s) & ((1 << w) - 1)) for v in (0x0123456789abcdef, flipped)
+                for s, w in main.PHASH_BANDS]
+        assert any(keys[i] == keys[i + len(main.PHASH_BANDS)] for i in range(len(main.PHASH_BANDS)))
+
+
+def test_hash_index_cache():
+    rng = np.random.default_rng(4)
+    with tempfile.TemporaryDirectory() as d:
+        path = save(d, "a.png", Image.fromarray(rng.integers(0, 256, (32, 32), dtype=np.uint8)))
+        index = main.HashIndex(os.path.join(d, "index", "hashes.sqlite3"))
+        try:
+            main.find_duplicates([path], index)
+            stat = os.stat(path)
+            cached = index.lookup(path, stat.st_size, stat.st_mtime_ns)
+            assert cached == main.compute_image_hashes(path)
+            assert index.lookup(path, stat.st_size + 1, stat.st_mtime_ns) is None
+        finally:
+            index.close()
+
+
+if __name__ == '__main__':
+    for name, func in list(globals().items()):
+        if name.startswith('test_'):
+            func()
+            print(f"✓ {name}")
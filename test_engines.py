@@ -0,0 +1,32 @@
+"""测试两种合成引擎：画布逐像素相同，像素校验值相同"""
+import os
+import tempfile
+
+import main
+from roundtrip_helpers import Image, make_inputs, same_pixels, stitch
+
+
+def test_engines_produce_identical_canvas():
+    for mode in main.CANVAS_CHANNELS:
+        with tempfile.TemporaryDirectory() as d:
+            paths = make_inputs(d, mode)
+            canvases, digests = [], []
+            for use_numpy in (True, False):
+                _, files = stitch(paths, os.path.join(d, f"combined_{use_numpy}.jpg"),
+                                  container='tiff', use_numpy=use_numpy)
+                canvas = Image.open(files[0])
+                canvases.append(canvas)
+                digests.append([item['pixel_digest'] for item in main.embedded_sheet_table(canvas)])
+            assert same_pixels(*canvases), mode
+            assert digests[0] == digests[1], mode
+
+
+def test_pillow_is_default_engine():
+    assert main.StitchWorker([], '').use_numpy is False
+
+
+if __name__ == '__main__':
+    for name, func in list(globals().items()):
+        if name.startswith('test_'):
+            func()
+            print(f"✓ {name}")
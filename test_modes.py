@@ -0,0 +1,67 @@
+"""测试色彩模式：各画布模式无损往返、调色板和1位图片还原、无法无损共存的组合给出提示"""
+import os
+import tempfile
+
+import numpy as np
+
+import main
+from roundtrip_helpers import Image, make_inputs, random_image, same_pixels, split, stitch
+
+
+def test_lossless_roundtrip_every_canvas_mode():
+    # 多页 TIFF 逐页无损，拆分结果应与原图逐像素相同
+    for mode in main.CANVAS_CHANNELS:
+        for use_numpy in (True, False):
+            with tempfile.TemporaryDirectory() as d:
+                paths = make_inputs(d, mode)
+                _, files = stitch(paths, os.path.join(d, "combined.jpg"), container='tiff', use_numpy=use_numpy)
+                out = os.path.join(d, "out")
+                os.makedirs(out)
+                message, _ = split([(files[0], None)], out)
+                assert f"像素校验：{len(paths)} 张一致" in message, message
+                for path in paths:
+                    restored = Image.open(os.path.join(out, os.path.basename(path)))
+                    assert same_pixels(Image.open(path), restored), (mode, use_numpy, path)
+
+
+def test_palette_and_bilevel_modes_restored():
+    with tempfile.TemporaryDirectory() as d:
+        rgb = random_image('RGB', (30, 50))
+        transparent = rgb.quantize(32)
+        transparent.info['transparency'] = 5
+        sources = {'p.png': rgb.quantize(64), 'one.png': rgb.convert('1'), 'pt.png': transparent}
+        paths = []
+        for name, img in sources.items():
+            paths.append(os.path.join(d, name))
+            img.save(paths[-1])
+        _, files = stitch(paths, os.path.join(d, "combined.jpg"), container='tiff')
+        out = os.path.join(d, "out")
+        os.makedirs(out)
+        split([(files[0], None)], out)
+        for path in paths:
+            assert same_pixels(Image.open(path), Image.open(os.path.join(out, os.path.basename(path)))), path
+
+
+def test_lossy_mixed_batch_is_reported():
+    with tempfile.TemporaryDirectory() as d:
+        paths = make_inputs(d, 'I;16')[:1] + make_inputs(d, 'RGB')[:1]
+        message, _ = stitch(paths, os.path.join(d, "combined.jpg"))
+        assert os.path.basename(paths[0]) in message and os.path.basename(paths[1]) not in message, message
+
+
+def test_narrow_to_8bit_matches_without_numpy():
+    img = Image.fromarray(np.arange(65536, dtype=np.uint16).reshape(256, 256))
+    with_numpy = np.asarray(main.narrow_to_8bit(img))
+    saved, main.np = main.np, None
+    try:
+        without_numpy = np.asarray(main.narrow_to_8bit(img))
+    finally:
+        main.np = saved
+    assert np.array_equal(with_numpy, without_numpy)
+
+
+if __name__ == '__main__':
+    for name, func in list(globals().items()):
+        if name.startswith('test_'):
+            func()
+            print(f"✓ {name}")
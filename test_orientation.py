@@ -0,0 +1,54 @@
+"""测试方向变换的组合和求逆，均与 Pillow 的 transpose 结果对比"""
+import numpy as np
+
+import main
+
+main.load_image_codecs()
+from main import Image
+
+# 宽高不同、每个像素都不同的测试图，任何错误的变换都会产生不同的结果
+SAMPLE = np.arange(5 * 7 * 3, dtype=np.uint8).reshape(5, 7, 3)
+TRANSFORMS = list(main.TRANSPOSE_MATRICES)
+
+
+def apply(img, transform):
+    return img if transform is None else img.transpose(Image.Transpose[transform])
+
+
+def test_compose_matches_pillow():
+    img = Image.fromarray(SAMPLE)
+    for first in TRANSFORMS:
+        for second in TRANSFORMS:
+            expected = np.asarray(apply(apply(img, first), second))
+            actual = np.asarray(apply(img, main.compose_transforms(first, second)))
+            assert np.array_equal(expected, actual), (first, second)
+
+
+def test_invert_restores_original():
+    img = Image.fromarray(SAMPLE)
+    for transform in TRANSFORMS:
+        restored = apply(apply(img, transform), main.invert_transform(transform))
+        assert np.array_equal(np.asarray(restored), SAMPLE), transform
+        assert main.compose_transforms(transform, main.invert_transform(transform)) is None
+
+
+def test_swaps_axes_matches_pillow():
+    img = Image.fromarray(SAMPLE)
+    for transform in TRANSFORMS:
+        expected = np.asarray(apply(img, transform))
+        assert main.swaps_axes(transform) == (expected.shape[:2] != SAMPLE.shape[:2]), transform
+
+
+def test_exif_orientations():
+    # EXIF 方向 1~8 对应的变换各不相同，且都能求逆
+    transforms = [main.EXIF_ORIENTATION_TRANSFORMS.get(o) for o in range(1, 9)]
+    assert len(set(transforms)) == 8
+    for transform in transforms:
+        assert main.invert_transform(main.invert_transform(transform)) == transform
+
+
+if __name__ == '__main__':
+    for name, func in list(globals().items()):
+        if name.startswith('test_'):
+            func()
+            print(f"✓ {name}")
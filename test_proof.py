@@ -0,0 +1,73 @@
+"""测试快速校样：各画布模式都能生成校样，坐标与原始分辨率的输出按比例一致"""
+import json
+import os
+import tempfile
+from pathlib import Path
+
+import main
+from roundtrip_helpers import Image, random_image, split, stitch
+
+
+def make_proof_inputs(directory, mode):
+    """竖向和横向图片各一张，RGB 另加一张 JPEG 以覆盖 draft 缩放解码"""
+    ext = '.tif' if mode == 'CMYK' else '.png'
+    paths = []
+    for name, size in (('portrait', (90, 130)), ('landscape', (140, 100))):
+        paths.append(os.path.join(directory, f"{name}_{mode.replace(';', '')}{ext}"))
+        random_image(mode, size).save(paths[-1])
+    if mode == 'RGB':
+        paths.append(os.path.join(directory, "photo.jpg"))
+        random_image('RGB', (160, 120)).save(paths[-1], quality=95)
+    return paths
+
+
+def load_table(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def test_proof_coordinates_match_full_run():
+    for mode in main.CANVAS_CHANNELS:
+        for scale in main.PROOF_SCALES:
+            with tempfile.TemporaryDirectory() as d:
+                paths = make_proof_inputs(d, mode)
+                _, full = stitch(paths, os.path.join(d, "combined.jpg"))
+                _, proof = stitch(paths, os.path.join(d, "combined.jpg"), proof_scale=scale)
+                assert Path(proof[0]).stem == "combined_proof", proof
+
+                full_size = Image.open(full[0]).size
+                proof_size = Image.open(proof[0]).size
+                assert proof_size == tuple(max(1, v // scale) for v in full_size), (mode, scale)
+
+                for full_item, proof_item in zip(load_table(full[1]), load_table(proof[1])):
+                    assert proof_item['filename'] == full_item['filename']
+                    assert proof_item['proof_scale'] == scale
+                    assert proof_item['x'] == full_item['x'] // scale, (mode, scale)
+                    assert proof_item['y'] == full_item['y'] // scale, (mode, scale)
+                    assert proof_item['width'] == max(1, full_item['width'] // scale), (mode, scale)
+                    assert proof_item['height'] == max(1, full_item['height'] // scale), (mode, scale)
+                    assert proof_item['transform'] == full_item['transform']
+                    assert proof_item['x'] + proof_item['width'] <= proof_size[0]
+                    assert proof_item['y'] + proof_item['height'] <= proof_size[1]
+
+
+def test_proof_splits_and_verifies():
+    for mode in main.CANVAS_CHANNELS:
+        with tempfile.TemporaryDirectory() as d:
+            paths = make_proof_inputs(d, mode)
+            _, proof = stitch(paths, os.path.join(d, "combined.jpg"), proof_scale=4)
+            out = os.path.join(d, "out")
+            os.makedirs(out)
+            message, tiles = split([(proof[0], proof[1])], out)
+            assert f"像素校验：{len(paths)} 张一致" in message, (mode, message)
+            for item, tile in zip(load_table(proof[1]), tiles):
+                size = Image.open(tile).size
+                expected = (item['width'], item['height'])
+                assert size in (expected, expected[::-1]), (mode, tile)
+
+
+if __name__ == '__main__':
+    for name, func in list(globals().items()):
+        if name.startswith('test_'):
+            func()
+            print(f"✓ {name}")
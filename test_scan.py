@@ -0,0 +1,85 @@
+"""测试递归扫描：按魔数识别图片、结果顺序、分块校验和取消扫描"""
+import os
+import tempfile
+
+import main
+
+main.load_image_codecs()
+from main import Image
+
+
+def save_image(path, image_format='PNG'):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    Image.new('RGB', (4, 6), 'red').save(path, image_format)
+    return path
+
+
+def write_bytes(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(data)
+    return path
+
+
+def test_sniff_image_format():
+    assert main.sniff_image_format(b'\xff\xd8\xff\xe0' + b'\0' * 12) == 'JPEG'
+    assert main.sniff_image_format(b'\x89PNG\r\n\x1a\n' + b'\0' * 8) == 'PNG'
+    assert main.sniff_image_format(b'BM' + b'\0' * 14) == 'BMP'
+    assert main.sniff_image_format(b'RIFF\0\0\0\0WEBPVP8 ') == 'WEBP'
+    assert main.sniff_image_format(b'\0\0\0\x18ftypheic\0\0\0\0') == 'HEIF'
+    assert main.sniff_image_format(b'\0\0\0\x18ftypisom\0\0\0\0') is None  # MP4 视频
+    assert main.sniff_image_format(b'II*\x00' + b'\0' * 12) == 'TIFF'
+    assert main.sniff_image_format(b'hello world, not an image') is None
+
+
+def test_magic_bytes_decide_not_extension():
+    with tempfile.TemporaryDirectory() as d:
+        good = save_image(os.path.join(d, "photo.jpg"), 'JPEG')
+        no_ext = save_image(os.path.join(d, "scan_without_extension"), 'PNG')
+        write_bytes(os.path.join(d, "fake.jpg"), b"not really a jpeg")
+        write_bytes(os.path.join(d, "truncated.png"), b'\x89PNG\r\n\x1a\n' + b'\0' * 8)
+        write_bytes(os.path.join(d, "empty.png"), b"")
+        assert main.scan_image_files([d]) == sorted([good, no_ext])
+
+
+def test_order_is_deterministic():
+    with tempfile.TemporaryDirectory() as d:
+        folder = os.path.join(d, "folder")
+        nested = [save_image(os.path.join(folder, name)) for name in ("b/2.png", "a/1.png", "c.png")]
+        loose = [save_image(os.path.join(d, name)) for name in ("z.png", "y.png")]
+        # 直接给出的文件保持原顺序并排在前面，文件夹中的图片按路径排序，重复的只保留第一次
+        result = main.scan_image_files([loose[0], folder, loose[1], nested[2]])
+        assert result == [loose[0], loose[1], nested[2]] + sorted(nested[:2]), result
+
+
+def test_large_directory_is_chunked_and_streamed():
+    count = main.SCAN_PROBE_CHUNK * 3 + 5
+    with tempfile.TemporaryDirectory() as d:
+        source = save_image(os.path.join(d, "src", "0.png"))
+        with open(source, 'rb') as f:
+            data = f.read()
+        paths = [write_bytes(os.path.join(d, "many", f"{i:04d}.png"), data) for i in range(count)]
+        chunks = []
+        result = main.scan_image_files([os.path.join(d, "many")], on_found=chunks.append, max_workers=2)
+        assert result == paths
+        assert sorted(p for chunk in chunks for p in chunk) == paths
+        assert max(len(chunk) for chunk in chunks) <= main.SCAN_PROBE_CHUNK
+
+
+def test_cancel_stops_scan():
+    with tempfile.TemporaryDirectory() as d:
+        for i in range(main.SCAN_PROBE_CHUNK * 4):
+            save_image(os.path.join(d, f"sub{i % 8}", f"{i}.png"))
+        found = []
+        result = main.scan_image_files([d], on_found=found.append, should_stop=lambda: bool(found),
+                                       max_workers=1)
+        assert len(found) == 1, len(found)
+        assert len(result) < main.SCAN_PROBE_CHUNK * 4
+        assert main.scan_image_files([d], should_stop=lambda: True) == []
+
+
+if __name__ == '__main__':
+    for name, func in list(globals().items()):
+        if name.startswith('test_'):
+            func()
+            print(f"✓ {name}")
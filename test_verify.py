@@ -0,0 +1,63 @@
+"""测试像素校验：默认输出校验通过，拼接图被修改后报告不一致"""
+import json
+import os
+import tempfile
+
+import main
+from roundtrip_helpers import Image, make_inputs, split, stitch
+
+
+def test_default_output_verifies():
+    # 默认输出（JPG 或 PNG + JSON）拆分时校验全部通过
+    for mode in main.CANVAS_CHANNELS:
+        with tempfile.TemporaryDirectory() as d:
+            paths = make_inputs(d, mode)
+            _, files = stitch(paths, os.path.join(d, "combined.jpg"))
+            out = os.path.join(d, "out")
+            os.makedirs(out)
+            message, tiles = split([(files[0], files[1])], out)
+            assert f"像素校验：{len(paths)} 张一致" in message, (mode, message)
+            for path, tile in zip(paths, tiles):
+                assert Image.open(tile).size == Image.open(path).size, (mode, path)
+
+
+def test_modified_composite_is_reported():
+    for mode in ('RGB', 'RGBA'):
+        with tempfile.TemporaryDirectory() as d:
+            paths = make_inputs(d, mode)
+            _, files = stitch(paths, os.path.join(d, "combined.jpg"))
+            with open(files[1], 'r', encoding='utf-8') as f:
+                table = json.load(f)
+            # 修改第2张图中的一个像素，只有这一张校验不一致
+            item = table[1]
+            image = Image.open(files[0])
+            image.load()
+            point = (item['x'] + 1, item['y'] + 1)
+            pixel = image.getpixel(point)
+            image.putpixel(point, tuple(255 - v for v in pixel))
+            save_options = {'quality': 100, 'subsampling': 0} if files[0].endswith('.jpg') else {}
+            image.save(files[0], **save_options)
+            statuses = main.verify_tiles(Image.open(files[0]), table)
+            assert statuses[1] == 'mismatch', (mode, statuses)
+            if not files[0].endswith('.jpg'):
+                # PNG 无损，其他图片不受影响
+                assert statuses == ['ok', 'mismatch', 'ok'], (mode, statuses)
+
+
+def test_missing_digest():
+    with tempfile.TemporaryDirectory() as d:
+        paths = make_inputs(d, 'L')
+        _, files = stitch(paths, os.path.join(d, "combined.jpg"))
+        with open(files[1], 'r', encoding='utf-8') as f:
+            table = json.load(f)
+        for item in table:
+            item.pop('pixel_digest', None)
+            item.pop('encoded_digest', None)
+        assert main.verify_tiles(Image.open(files[0]), table) == ['missing'] * len(paths)
+
+
+if __name__ == '__main__':
+    for name, func in list(globals().items()):
+        if name.startswith('test_'):
+            func()
+            print(f"✓ {name}")